@@ -7,12 +7,14 @@
 """
 
 import time
+import logging
 from twisted.internet import defer, reactor
 from serial.serialutil import SerialException
 import ion.util.ionlog
 from ion.core.process.process import ProcessFactory
 from ion.agents.instrumentagents.instrument_driver import InstrumentDriver
 from ion.agents.instrumentagents.instrument_driver import InstrumentDriverClient
+from ion.agents.instrumentagents.instrument_driver import list_types
 from ion.agents.instrumentagents.instrument_fsm import InstrumentFSM
 from ion.agents.instrumentagents.instrument_constants \
     import DriverCommand, DriverCapability, DriverStatus,\
@@ -28,7 +30,9 @@ import ion.util.procutils as pu
 import ion.agents.instrumentagents.helper_NMEA0183 as NMEA
 
 from twisted.protocols import basic
+from twisted.internet import abstract
 from twisted.internet.serialport import SerialPort
+from serial import Serial
 from serial import PARITY_NONE, PARITY_EVEN, PARITY_ODD
 from serial import STOPBITS_ONE, STOPBITS_TWO
 from serial import FIVEBITS, SIXBITS, SEVENBITS, EIGHTBITS
@@ -40,6 +44,11 @@ OFF = "Off"
 ON = "On"
 ONCE = "1"
 
+"""
+Default for single lookups of keys whose values may be None.
+"""
+_missing = object()
+
 ###############################################################################
 # Driver-specific constants
 ###############################################################################
@@ -198,7 +207,7 @@ class CfgNMEADevice(object):
         if toWrite:
             if NMEADeviceDriver.serConnection:
                 NMEADeviceDriver.serConnection.write (toWrite)
-                log.debug('Written to GPS: %s' % toWrite)
+                log.debug('Written to GPS: %s', toWrite)
 
     def _BuildPGRMO(self, NMEA_CD, toSet):
         if NMEA_CD in self.validSet and toSet in [ON, OFF]:
@@ -328,6 +337,22 @@ class CfgNMEADevice(object):
         coreStr = ','.join (str)
         return '$' + coreStr + '\r\n'
 
+class OpenedSerialPort(SerialPort):
+    """
+    SerialPort transport around a pyserial port that was already opened,
+    so the open itself can be done off the reactor thread.
+    """
+
+    def __init__(self, protocol, serialPort, reactor):
+        abstract.FileDescriptor.__init__(self, reactor)
+        self._serial = serialPort
+        self.reactor = reactor
+        self.flushInput()
+        self.flushOutput()
+        self.protocol = protocol
+        self.protocol.makeConnection(self)
+        self.startReading()
+
 ###############################################################################
 # NMEA Device Driver
 ###############################################################################
@@ -640,7 +665,7 @@ class NMEADeviceDriver(InstrumentDriver):
             # params is a single command list, already checked for channels
             # and sanitized in op_execute
             if params[0] == NMEADeviceCommand.ACQUIRE_SAMPLE:
-                log.debug('ACQUIRE SAMPLE called %d' % len(self._most_recent))
+                log.debug('ACQUIRE SAMPLE called %d', len(self._most_recent))
                 turnedOn = False
 
                 # At least one valid sentence should be turned on
@@ -652,7 +677,7 @@ class NMEADeviceDriver(InstrumentDriver):
                     success = result['success']
                     result = result['result']
                     if len(result) > 0:
-                        log.debug('Acquired sample: %s' % result)
+                        log.debug('Acquired sample: %s', result)
                         content = {'type': DriverAnnouncement.DATA_RECEIVED,
                                    'transducer': NMEADeviceChannel.GPS,
                                    'value': result}
@@ -673,18 +698,20 @@ class NMEADeviceDriver(InstrumentDriver):
 
         elif event == NMEADeviceEvent.DATA_RECEIVED:
             log.debug("NMEA Driver ready to publish data to agent")
+            # Bound once, this loop runs for every streamed line. The line
+            # list itself is looked up each pass, _acquire_sample replaces it.
+            send = self.send
+            supid = self.proc_supid
             while self._data_lines:
                 nmeaLine = self._data_lines.pop()
                 if len(nmeaLine) > 0:
                     # This is where NMEA data is published
                     if self._serialReadMode == ON:
-                        log.debug('Streaming data published: %s' % nmeaLine)
+                        log.debug('Streaming data published: %s', nmeaLine)
                         content = {'type': DriverAnnouncement.DATA_RECEIVED,
                                    'transducer': NMEADeviceChannel.GPS,
                                    'value': nmeaLine}
-                        yield self.send(self.proc_supid,
-                                        'driver_event_occurred',
-                                        content)
+                        yield send(supid, 'driver_event_occurred', content)
 
         else:
             success = InstErrorCode.INCORRECT_STATE
@@ -835,16 +862,19 @@ class NMEADeviceDriver(InstrumentDriver):
         connectionResult = NMEADeviceEvent.CONNECTION_COMPLETE
         try:
             log.debug("Driver is attempting serial connection to device....")
-            NMEADeviceDriver.serConnection =  SerialPort(self._protocol,
-                                              self._port,
-                                              reactor,
-                                              baudrate=self._baudrate,
-                                              bytesize=self._bytesize,
-                                              parity=self._parity,
-                                              stopbits=self._stopbits,
-                                              timeout=self._timeout,
-                                              xonxoff=self._xonxoff,
-                                              rtscts=self._rtscts)
+            # Opening the device can block, keep it off the reactor thread.
+            serialPort = yield self._blocking_call(Serial,
+                                                   self._port,
+                                                   baudrate=self._baudrate,
+                                                   bytesize=self._bytesize,
+                                                   parity=self._parity,
+                                                   stopbits=self._stopbits,
+                                                   timeout=self._timeout,
+                                                   xonxoff=self._xonxoff,
+                                                   rtscts=self._rtscts)
+            NMEADeviceDriver.serConnection = OpenedSerialPort(self._protocol,
+                                                              serialPort,
+                                                              reactor)
         except SerialException, e:
             log.debug("Driver's Serial connection failed: %s", e)
             connectionResult = NMEADeviceEvent.CONNECTION_FAILED
@@ -892,7 +922,6 @@ class NMEADeviceDriver(InstrumentDriver):
     # Agent interface methods.
     ###########################################################################
 
-    @defer.inlineCallbacks
     def op_execute(self, content, headers, msg):
         """
         Execute a driver command. Commands may be common or specific to the
@@ -918,17 +947,15 @@ class NMEADeviceDriver(InstrumentDriver):
         # Fail if required parameters are absent
         if not command:
             reply['success'] = InstErrorCode.REQUIRED_PARAMETER
-            yield self.reply_ok(msg, reply)
-            return
+            return self.reply_ok(msg, reply)
 
         if not channels:
             reply['success'] = InstErrorCode.REQUIRED_PARAMETER
-            yield self.reply_ok(msg, reply)
-            return
+            return self.reply_ok(msg, reply)
 
-        assert(isinstance(command,(list, tuple)))
+        assert(isinstance(command, list_types))
         assert(all(map(lambda x: isinstance(x, str), command)))
-        assert(isinstance(channels,(list, tuple)))
+        assert(isinstance(channels, list_types))
         assert(all(map(lambda x: isinstance(x, str), channels)))
 
         if timeout is not None:
@@ -939,14 +966,12 @@ class NMEADeviceDriver(InstrumentDriver):
         # Fail if command or channels not valid for this instrument
         if not NMEADeviceCommand.has(command[0]):
             reply['success'] = InstErrorCode.UNKNOWN_COMMAND
-            yield self.reply_ok(msg, reply)
-            return
+            return self.reply_ok(msg, reply)
 
         for chan in channels:
             if not NMEADeviceChannel.has(chan):
                 reply['success'] = InstErrorCode.UNKNOWN_CHANNEL
-                yield self.reply_ok(msg, reply)
-                return
+                return self.reply_ok(msg, reply)
 
         # Reaching here means we parse the command
         drv_cmd = command[0]
@@ -957,13 +982,10 @@ class NMEADeviceDriver(InstrumentDriver):
             # Fail if the channel is not set properly.
             if len(channels) > 1 or channels[0] != (NMEADeviceChannel.GPS):
                 reply['success'] = InstErrorCode.INVALID_CHANNEL
-                yield self.reply_ok(msg, reply)
-                return
+                return self.reply_ok(msg, reply)
             else:
-                # Send an execute event and setup reply            
-                (success,result) = yield self.fsm.on_event_async(NMEADeviceEvent.EXECUTE, command)
-                reply['success'] = success
-                reply['result'] = result
+                # Send an execute event and setup reply.
+                return self._execute(msg, command)
 
         # Process test command.
         elif drv_cmd in [NMEADeviceCommand.TEST,
@@ -972,17 +994,26 @@ class NMEADeviceDriver(InstrumentDriver):
                          NMEADeviceCommand.TEST_ERRORS]:
             # Return not implemented reply.
             reply['success'] = InstErrorCode.NOT_IMPLEMENTED
-            yield self.reply_ok(msg, reply)
-            return
+            return self.reply_ok(msg, reply)
 
         else:
             # The command is properly handled in the above clause.
             reply['success'] = InstErrorCode.INVALID_COMMAND
-            yield self.reply_ok(msg, reply)
-            return
-
-        yield self.reply_ok(msg,reply)        
+            return self.reply_ok(msg, reply)
 
+    @defer.inlineCallbacks
+    def _execute(self, msg, command):
+        """
+        Send a validated sampling command through the FSM and reply with the
+        result. The op_execute rejections reply without going through
+        inlineCallbacks.
+        @param msg The op message to reply to.
+        @param command The command list.
+        """
+        (success, result) = yield self.fsm.on_event_async(
+            NMEADeviceEvent.EXECUTE, command)
+        reply = {'success': success, 'result': result}
+        yield self.reply_ok(msg, reply)
 
     @defer.inlineCallbacks
     def op_get(self, content, headers, msg):
@@ -997,7 +1028,7 @@ class NMEADeviceDriver(InstrumentDriver):
         """
         assert(isinstance(content, dict)), 'Expected dict content.'
         params = content.get('params', None)
-        assert(isinstance(params,(list, tuple))), 'Expected list or tuple params.'
+        assert(isinstance(params, list_types)), 'Expected list or tuple params.'
         timeout = content.get('timeout', None)
         if timeout:
             assert(isinstance(timeout, int)), 'Expected integer timeout'
@@ -1036,7 +1067,6 @@ class NMEADeviceDriver(InstrumentDriver):
         reply['result'] = result
         yield self.reply_ok(msg, reply)
 
-    @defer.inlineCallbacks
     def op_execute_direct(self, content, headers, msg):
         """
         Execute untranslated commands on the device.
@@ -1059,9 +1089,8 @@ class NMEADeviceDriver(InstrumentDriver):
 
         # The method is not implemented.
         reply = {'success':InstErrorCode.NOT_IMPLEMENTED,'result':None}
-        yield self.reply_ok(msg, reply)
+        return self.reply_ok(msg, reply)
 
-    @defer.inlineCallbacks
     def op_get_metadata(self, content, headers, msg):
         """
         Retrieve metadata for the device, its transducers and parameters.
@@ -1076,7 +1105,7 @@ class NMEADeviceDriver(InstrumentDriver):
 
         assert(isinstance(content,dict)), 'Expected dict content.'
         params = content.get('params',None)
-        assert(isinstance(params,(list,tuple))), 'Expected list params.'
+        assert(isinstance(params, list_types)), 'Expected list params.'
         assert(all(map(lambda x:isinstance(x,tuple),params))), \
             'Expected tuple arguments'
 
@@ -1089,9 +1118,8 @@ class NMEADeviceDriver(InstrumentDriver):
 
         # The method is not implemented.
         reply = {'success':InstErrorCode.NOT_IMPLEMENTED,'result':None}
-        yield self.reply_ok(msg, reply)
+        return self.reply_ok(msg, reply)
 
-    @defer.inlineCallbacks
     def op_get_status(self, content, headers, msg):     # XX
         """
         Obtain the status of the device. This includes non-parameter
@@ -1106,7 +1134,7 @@ class NMEADeviceDriver(InstrumentDriver):
 
         assert(isinstance(content, dict)), 'Expected dict content.'
         params = content.get('params', None)
-        assert(isinstance(params,(list, tuple))), 'Expected list or tuple params.'
+        assert(isinstance(params, list_types)), 'Expected list or tuple params.'
         assert(all(map(lambda x:isinstance(x, tuple), params))), \
             'Expected tuple arguments'
 
@@ -1117,9 +1145,8 @@ class NMEADeviceDriver(InstrumentDriver):
             assert(timeout > 0), 'Expected positive timeout'
 
         reply = self._get_status(params)
-        yield self.reply_ok(msg, reply)
+        return self.reply_ok(msg, reply)
 
-    @defer.inlineCallbacks
     def op_get_capabilities(self, content, headers, msg):
         """
         Obtain the capabilities of the device, including available commands,
@@ -1133,7 +1160,7 @@ class NMEADeviceDriver(InstrumentDriver):
 
         assert(isinstance(content,dict)), 'Expected dict content.'
         params = content.get('params',None)
-        assert(isinstance(params,(list,tuple))), 'Expected list or tuple params.'
+        assert(isinstance(params, list_types)), 'Expected list or tuple params.'
 
         # Timeout not implemented for this op.
         timeout = content.get('timeout',None)
@@ -1144,7 +1171,7 @@ class NMEADeviceDriver(InstrumentDriver):
 
         # The method is not implemented.
         reply = self._get_capabilities(params)
-        yield self.reply_ok(msg, reply)
+        return self.reply_ok(msg, reply)
 
     @defer.inlineCallbacks
     def op_initialize(self, content, headers, msg):
@@ -1257,7 +1284,6 @@ class NMEADeviceDriver(InstrumentDriver):
 # Nonstandard interface methods.
 ###########################################################################
 
-    @defer.inlineCallbacks
     def op_get_state(self, content, headers, msg):
         """
         Retrieve the current state of the driver.
@@ -1268,7 +1294,7 @@ class NMEADeviceDriver(InstrumentDriver):
 
         # Get current state from the state machine and reply.
         cur_state = self.fsm.get_current_state()
-        yield self.reply_ok(msg, cur_state)
+        return self.reply_ok(msg, cur_state)
 
 ###########################################################################
 # Nonpublic methods.
@@ -1277,13 +1303,17 @@ class NMEADeviceDriver(InstrumentDriver):
         """
         Dump state and event status to stdio.
         """
+        # Called on every FSM event, including each line read.
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+
         debugStr = "%s  %s" % (self.fsm.current_state, event)
         if isinstance(data, dict):
             for (key, val) in data.iteritems():
                 debugStr += str(key) + '  ' + str(val)
-            if data is not None:
-                debugStr += data
-            log.debug(debugStr)
+        elif data is not None:
+            debugStr += str(data)
+        log.debug(debugStr)
 
     def _configure(self, params):
         """
@@ -1551,8 +1581,7 @@ class NMEADeviceDriver(InstrumentDriver):
         result = {}
         set_errors = False
 
-        for (chan, param) in params.keys():
-            val = params[(chan, param)]
+        for ((chan, param), val) in params.iteritems():
             if (val == None) or (val == ''):
                 continue
             if self._device_NMEA_config.defParams.get(param) is not None:
@@ -1569,7 +1598,7 @@ class NMEADeviceDriver(InstrumentDriver):
                         log.info('NMEA Driver: Could not set sentence %s to %s.' %(param, val))
                 else:
                     # Doing PGRMC stuff here
-                    if param in self._device_NMEA_config.cfgParams.keys():
+                    if param in self._device_NMEA_config.cfgParams:
                         self._device_NMEA_config.SendConfigToDevice({param: val})
                         self._device_NMEA_config.cfgParams[param] = val
                         result[(chan, param)] = InstErrorCode.OK
@@ -1592,9 +1621,9 @@ class NMEADeviceDriver(InstrumentDriver):
         """
         Sets local parameters based on a parameters sentence from the device
         """
-        for nmeaKey in nmeaData.keys():
+        for (nmeaKey, nmeaVal) in nmeaData.iteritems():
             if self._device_NMEA_config.defParams.get(nmeaKey):
-                self._device_NMEA_config.cfgParams[nmeaKey] = nmeaData[nmeaKey]
+                self._device_NMEA_config.cfgParams[nmeaKey] = nmeaVal
 
     def _get_parameters(self, params):
         """
@@ -1614,14 +1643,17 @@ class NMEADeviceDriver(InstrumentDriver):
 
         # TODO: Separate parameters from .GPS into .INSTRUMENT
         log.debug (params)
+        cfgParams = self._device_NMEA_config.cfgParams
         for(chan, param) in params:
             if chan in GoodValues.validChans:
                 if chan == NMEADeviceChannel.ALL or chan == gpsChan:
                     if param == NMEADeviceParam.ALL:
-                        for (key, val) in self._device_NMEA_config.cfgParams.iteritems():
+                        for (key, val) in cfgParams.iteritems():
                             result[(gpsChan, key)] = (InstErrorCode.OK, val)
-                    elif self._device_NMEA_config.cfgParams.has_key(param):
-                        val = self._device_NMEA_config.cfgParams[param]
+                        continue
+
+                    val = cfgParams.get(param, _missing)
+                    if val is not _missing:
                         result[(gpsChan, param)] = (InstErrorCode.OK, val)
                     else:
                         result[(chan, param)] = (InstErrorCode.INVALID_PARAMETER, None)
@@ -6,6 +6,7 @@
 @brief Helper code for working with NMEA0183 devices and parsing NMEA0183 strings
 """
 
+from operator import xor
 from string import hexdigits
 from ion.agents.instrumentagents.instrument_constants import InstErrorCode, BaseEnum
 import ion.util.ionlog
@@ -311,7 +312,7 @@ class NMEAInString ():
 
         # Strip out NMEA type code and verify it is known to this parser
         self._nmeaType = self._inNMEA[1:firstComma]
-        if not NMEADefs.nmeaInTypes.has_key (self._nmeaType):
+        if self._nmeaType not in NMEADefs.nmeaInTypes:
             return NMEAErrorCode.UNKNOWN_NMEA_CODE
 
         return NMEAErrorCode.OK
@@ -355,9 +356,7 @@ class NMEAInString ():
         # DESC     string  Short description of the NMEA sentence
         self._dataOut['DESC'] = howToParse[0]
 
-        for howTo in howToParse[1:]:
-
-            item = parsed[howToParse.index (howTo)]
+        for (howTo, item) in zip (howToParse[1:], parsed[1:]):
 
             # TARGET  string   For $PFRMO, the sentence to turn on or off
             if howTo == 'TARGET':
@@ -427,11 +426,13 @@ class NMEAString ():
     def __init__(self, nmeaString):
         """
         Takes the NMEA string through the entire parsing process.
+        The string is parsed on the first GetNMEAData call.
         @param  nmeaString  Complete NMEA line from $ to <CR><LF>
         """
 
         self.nmeaStr = nmeaString
         self.valid = self.ValidateNMEA()
+        self.parsed = None
 
     def IsValid (self):
         """
@@ -448,9 +449,10 @@ class NMEAString ():
 
         if NMEAErrorCode.is_error (self.valid):
             return self.valid
-        parsedOK = self.ParseNMEA()
-        if NMEAErrorCode.is_error (parsedOK):
-            return parsedOK
+        if self.parsed is None:
+            self.parsed = self.ParseNMEA()
+        if NMEAErrorCode.is_error (self.parsed):
+            return self.parsed
         return self.dataOut
 
     def NMEAChecksum (self, nmeaCS, checkH, checkL):
@@ -469,18 +471,11 @@ class NMEAString ():
         # Calculate checksum
         # checksum = 8-bit XOR of all chars in string
         # result is an 8-bit number (0 to 255)
-        cs = ord (reduce (lambda x, y: chr (ord (x) ^ ord (y)), nmeaCS))
-        low = 48 + (cs & 15)           # CS and 00001111
-        if low > 57:
-            low += 7;
-        high = 48 + ((cs & 240) >> 4)  # CS and 11110000
-        if high > 58:
-            high += 7;
-        calcLow = chr (low)
-        calcHigh = chr (high)
+        cs = reduce (xor, bytearray (nmeaCS), 0)
+        calcSum = '%02X' % cs          # Two upper case hex nibbles
 
         # Validate calculated against what the NMEA string said it should be
-        if (calcLow == checkL and calcHigh == checkH):
+        if (calcSum[1] == checkL and calcSum[0] == checkH):
             return NMEAErrorCode.OK
         return NMEAErrorCode.INVALID_NMEA_STRING
 
@@ -528,7 +523,7 @@ class NMEAString ():
 
         # Strip out NMEA type code and verify it is known to this parser
         self.nmeaType = self.nmeaStr[1:firstComma]
-        if not NMEADefs.nmeaTypes.has_key (self.nmeaType):
+        if self.nmeaType not in NMEADefs.nmeaTypes:
             return NMEAErrorCode.UNKNOWN_NMEA_CODE
 
         # Validate CEHCKSUM (if there is one)
@@ -604,9 +599,7 @@ class NMEAString ():
         rawLat = gpsNAN
         rawLon = gpsNAN
 
-        for howTo in howToParse[1:]:
-
-            item = parsed[howToParse.index (howTo)]
+        for (howTo, item) in zip (howToParse[1:], parsed[1:]):
 
             # UTC_HMS  double  UTC time on a 24hr clock as HHMMSS.S
             #                  (1hz GPS as HHMMSS)
@@ -9,6 +9,7 @@
 
 
 import os
+import logging
 from uuid import uuid4
 
 from twisted.internet import defer, reactor
@@ -23,6 +24,7 @@ from ion.core.process.process import Process
 from ion.core.process.process import ProcessClient
 from ion.core.process.process import ProcessFactory
 from ion.core.process.process import ProcessDesc
+from ion.core.exception import ApplicationError
 from ion.services.dm.distribution.events import InfoLoggingEventPublisher
 from ion.services.dm.distribution.events \
     import BusinessStateModificationEventPublisher
@@ -79,6 +81,136 @@ ci_param_metadata = {
          MetadataParameter.FRIENDLY_NAME: 'Max Transaction Acquire Timeout'},
 }
 
+"""
+Prebuilt replies for ops rejected before a transaction is established,
+keyed by the tuple form of the error code. Ops get copies, since handlers
+may fill in the reply.
+"""
+error_replies = dict((tuple(val), {'success': val, 'result': None,
+                                   'transaction_id': None})
+                     for val in InstErrorCode.values() if val != InstErrorCode.OK)
+
+"""
+Content fields of the agent ops, as (key, types) pairs for _validate_content.
+"""
+command_fields = (('command', (tuple, list)), ('transaction_id', (str,)))
+params_list_fields = (('params', (tuple, list)), ('transaction_id', (str,)))
+params_dict_fields = (('params', (dict,)), ('transaction_id', (str,)))
+channels_command_fields = (('channels', (tuple, list)),
+                           ('command', (tuple, list)),
+                           ('transaction_id', (str,)))
+bytes_fields = (('bytes', (str,)), ('transaction_id', (str,)))
+driver_event_fields = (('type', (str,)), ('transducer', (str,)))
+
+"""
+Transaction ID values with special meaning to _verify_transaction.
+"""
+special_tids = frozenset(('create', 'none'))
+
+"""
+Enum value sets for the per-parameter membership tests in the observatory
+ops.
+"""
+agent_events = frozenset(AgentEvent.values())
+agent_params = frozenset(AgentParameter.values())
+agent_statuses = frozenset(AgentStatus.values())
+instrument_capabilities = frozenset(InstrumentCapability.values())
+observatory_capabilities = frozenset(ObservatoryCapability.values())
+driver_capabilities = frozenset(DriverCapability.values())
+
+"""
+Agent states the instrument facing device ops are allowed in.
+"""
+observatory_states = frozenset((AgentState.OBSERVATORY_MODE,))
+device_get_states = frozenset((AgentState.OBSERVATORY_MODE, AgentState.IDLE,
+                               AgentState.STOPPED))
+direct_access_states = frozenset((AgentState.DIRECT_ACCESS_MODE,))
+
+"""
+Values of the observatory capabilities, and the capabilities each of the ALL
+capabilities expands to, for op_get_capabilities.
+"""
+observatory_capability_values = {
+    InstrumentCapability.OBSERVATORY_COMMANDS: AgentCommand.list(),
+    InstrumentCapability.OBSERVATORY_PARAMS: AgentParameter.list(),
+    InstrumentCapability.OBSERVATORY_STATUSES: AgentStatus.list(),
+    InstrumentCapability.OBSERVATORY_METADATA: MetadataParameter.list()
+}
+device_capability_keys = (InstrumentCapability.DEVICE_CHANNELS,
+                          InstrumentCapability.DEVICE_COMMANDS,
+                          InstrumentCapability.DEVICE_METADATA,
+                          InstrumentCapability.DEVICE_PARAMS,
+                          InstrumentCapability.DEVICE_STATUSES)
+capability_groups = {
+    InstrumentCapability.OBSERVATORY_ALL:
+        tuple(observatory_capability_values),
+    InstrumentCapability.DEVICE_ALL: device_capability_keys,
+    InstrumentCapability.ALL:
+        tuple(observatory_capability_values) + device_capability_keys
+}
+"""
+Agent connection state for each agent state, used by _get_connection_state.
+Any other state maps to AgentConnectionState.UNKOWN.
+"""
+connection_states = {
+    AgentState.POWERED_DOWN: AgentConnectionState.POWERED_DOWN,
+    AgentState.UNINITIALIZED: AgentConnectionState.NO_DRIVER,
+    AgentState.INACTIVE: AgentConnectionState.DISCONNECTED,
+    AgentState.IDLE: AgentConnectionState.CONNECTED,
+    AgentState.STOPPED: AgentConnectionState.CONNECTED,
+    AgentState.OBSERVATORY_MODE: AgentConnectionState.CONNECTED,
+    AgentState.DIRECT_ACCESS_MODE: AgentConnectionState.CONNECTED
+}
+"""
+Driver status and parameter keys read on each driver announcement.
+"""
+observatory_state_key = (DriverChannel.INSTRUMENT,
+                         DriverStatus.OBSERVATORY_STATE)
+all_params_key = (DriverChannel.ALL, DriverParameter.ALL)
+
+"""
+Agent publisher attribute for each kind of per-transducer event.
+"""
+publisher_names = {
+    'data': '_data_publisher',
+    'log': '_log_publisher'
+}
+
+"""
+Handler method names of the driver announcements the agent acts on, used by
+op_driver_event_occurred in place of an if/elif chain on the announcement.
+"""
+driver_event_handlers = {
+    DriverAnnouncement.DATA_RECEIVED: '_driver_data_received',
+    DriverAnnouncement.CONFIG_CHANGE: '_driver_config_changed',
+    DriverAnnouncement.STATE_CHANGE: '_driver_state_changed'
+}
+
+
+def _validate_content(content, *fields):
+    """
+    Validate the content of an op message.
+    @param content The message content, expected to be a dict.
+    @param fields (key, types) pairs giving the required content keys and
+        the tuple of exact types allowed for each value.
+    @retval A list of the content values in the order of fields.
+    @exception ApplicationError (400) if the content is not valid. Unlike
+        assertions these checks are kept under python -O.
+    """
+
+    if type(content) is not dict:
+        raise ApplicationError('Expected a dict content.', 400)
+
+    vals = []
+    for (key, types) in fields:
+        val = content.get(key, None)
+        if type(val) not in types:
+            raise ApplicationError('Expected %s of type %s.' % (key, types),
+                                   400)
+        vals.append(val)
+
+    return vals
+
 
 class InstrumentAgent(Process):
     """
@@ -133,6 +265,12 @@ class InstrumentAgent(Process):
         """
         self._condemned_drivers = []
 
+        """
+        Names of the child processes, kept in step with child_procs for
+        the membership test in _is_child_process.
+        """
+        self._child_proc_names = set()
+
         """
         The driver client to communicate with the child driver.
         """
@@ -176,6 +314,13 @@ class InstrumentAgent(Process):
             BusinessStateModificationEventPublisher(process=self,
                                     origin=self.event_publisher_origin)
 
+        """
+        Publish method and origin for each (kind, transducer) pair, where
+        kind is a key of publisher_names. Built on first use by
+        _get_publish_target and cleared on driver config changes.
+        """
+        self._publish_targets = {}
+
         """
         The transducer of the last data received event. Used to publish
         left over buffer contents on end of a streaming session.
@@ -259,6 +404,18 @@ class InstrumentAgent(Process):
         """
         self._data_buffer_limit = 0
 
+        """
+        Data samples received outside streaming mode that are waiting to be
+        published, keyed by transducer, and the pending call that publishes
+        them. Samples are coalesced for data-flush-delay seconds (default 0,
+        the end of the current reactor iteration) or until a transducer holds
+        data-flush-limit samples.
+        """
+        self._data_pending = {}
+        self._data_flush_call = None
+        self._data_flush_delay = self.spawn_args.get('data-flush-delay', 0)
+        self._data_flush_limit = self.spawn_args.get('data-flush-limit', 100)
+
         """
         A dict of device capabilities that is read from the driver upon
         driver construction. The dict persists whether we are connected to
@@ -303,6 +460,14 @@ class InstrumentAgent(Process):
         # Set initial state.
         self._fsm.start(AgentState.UNINITIALIZED)
 
+    @defer.inlineCallbacks
+    def plc_terminate(self):
+        """
+        Process lifecycle termination. Publish any data samples still queued.
+        """
+        if self._data_pending:
+            yield self._flush_data()
+
     ###########################################################################
     #   State handlers.
     ###########################################################################
@@ -750,7 +915,8 @@ class InstrumentAgent(Process):
             'transaction_id' transaction ID UUID string.
         """
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
+        if type(content) is not dict:
+            raise ApplicationError('Expected a dict content.', 400)
         acq_timeout = content.get('acq_timeout', None)
         exp_timeout = content.get('exp_timeout', None)
         assert(acq_timeout == None or
@@ -808,9 +974,10 @@ class InstrumentAgent(Process):
 
         # If the resource is free, issue a new transaction immediately.
         if self.transaction_id == None:
-            self.transaction_id = str(uuid4())
+            tid = str(uuid4())
+            self.transaction_id = tid
 
-            self._debug_print('started transaction', self.transaction_id)
+            self._debug_print('started transaction', tid)
 
             # Create and queue up a transaction expiration callback.
             def transaction_expired():
@@ -818,20 +985,21 @@ class InstrumentAgent(Process):
                 A callback to expire a transaction. Either retire
                 the transaction directly (no protected call running), or set
                 a flag for a protected call to do the cleanup when finishing.
+                The callback is bound to the ID it was created for.
                 """
 
-                self._debug_print('transaction expired', self.transaction_id)
+                self._debug_print('transaction expired', tid)
 
                 self._transaction_timeout_call = None
                 if self._in_protected_function:
                     self._transaction_timed_out = True
                 else:
 
-                    self._end_transaction(self.transaction_id)
+                    self._end_transaction(tid)
 
             self._transaction_timeout_call = reactor.callLater(exp_timeout,
                                                         transaction_expired)
-            return (InstErrorCode.OK, self.transaction_id)
+            return (InstErrorCode.OK, tid)
 
         # Otherwise return locked resource error.
         else:
@@ -993,7 +1161,6 @@ class InstrumentAgent(Process):
 
         return result
 
-    @defer.inlineCallbacks
     def _verify_transaction(self, tid, optype):
         """
         Verify the passed transaction ID is currently open, or open an
@@ -1002,15 +1169,23 @@ class InstrumentAgent(Process):
             perform the operation without a transaction, or a UUID to test
             against the current transaction ID.
         @param optype 'get' 'set' or 'execute'
-        @retval True if the transaction is valid or if one was successfully
-            created, False otherwise.
+        @retval The success code. Errors are published to the log publisher
+            without waiting on the publication.
         """
 
         assert(isinstance(tid, str)), 'Expected transaction ID str.'
         assert(isinstance(optype, str)), 'Expected str optype.'
 
+        cur_tid = self.transaction_id
         success = None
-        if tid != 'create' and tid != 'none' and len(tid) != 36:
+
+        # Ops sent under the open transaction are the common case, check
+        # it first. cur_tid is None or a 36 character ID, never a special
+        # tid.
+        if tid == cur_tid:
+            success = InstErrorCode.OK
+
+        elif tid not in special_tids and len(tid) != 36:
             success = InstErrorCode.INVALID_TRANSACTION_ID
 
         # Try to start an implicit transaction if tid is 'create'
@@ -1024,35 +1199,60 @@ class InstrumentAgent(Process):
                 success = InstErrorCode.LOCKED_RESOURCE
 
         # Allow only gets without a current or created transaction.
-        elif tid == 'none' and self.transaction_id == None and optype == 'get':
-            success = InstErrorCode.OK
-
-        # Otherwise, the given ID must match the outstanding one
-        elif (tid == self.transaction_id):
+        elif tid == 'none' and cur_tid == None and optype == 'get':
             success = InstErrorCode.OK
 
+        # Otherwise the given ID does not match the outstanding one.
         else:
             success = InstErrorCode.LOCKED_RESOURCE
 
         # Publish any errors.
         if InstErrorCode.is_error(success):
-            desc_str = 'Error in verify_transaction: ' + \
-                       InstErrorCode.get_string(success)
-            origin = "agent.%s" % self.event_publisher_origin
-            yield self._log_publisher.create_and_publish_event(origin=origin,
-                description=desc_str)
+            d = self._publish_op_error('verify_transaction', success)
+            d.addErrback(lambda reason: log.error(
+                'Could not publish transaction error: %s' %
+                reason.getErrorMessage()))
+
+        return success
+
+    def _begin_op(self, tid, optype):
+        """
+        Verify the transaction given to an op and set up the op reply.
+        @param tid The transaction ID given to the op.
+        @param optype 'get' 'set' or 'execute'
+        @retval A tuple (success, reply). If the transaction is valid, reply
+            is a new reply dict for the current transaction. Otherwise reply
+            is a copy of the prebuilt error reply and the op is no longer
+            protected.
+        """
+        success = self._verify_transaction(tid, optype)
+        if InstErrorCode.is_error(success):
+            self._in_protected_function = False
+            return (success, dict(error_replies[tuple(success)]))
 
-        defer.returnValue(success)
+        return (success, {'success': None, 'result': None,
+                          'transaction_id': self.transaction_id})
+
+    def _publish_op_error(self, op, success):
+        """
+        Publish an op error description to the log publisher.
+        @param op The name of the op reporting the error.
+        @param success The error code.
+        @retval A deferred that fires when the event is published.
+        """
+        desc_str = 'Error in ' + op + ': ' + InstErrorCode.get_string(success)
+        origin = "agent.%s" % self.event_publisher_origin
+        return self._log_publisher.create_and_publish_event(origin=origin,
+                                                        description=desc_str)
 
     ###########################################################################
     #   Observatory Facing Interface
     ###########################################################################
 
-    @defer.inlineCallbacks
     def op_hello(self, content, headers, msg):
 
         # The following line shows how to reply to a message
-        yield self.reply_ok(msg, {'value': 'Hello there, ' + str(content)}, {})
+        return self.reply_ok(msg, {'value': 'Hello there, ' + str(content)}, {})
 
     @defer.inlineCallbacks
     def op_execute_observatory(self, content, headers, msg):
@@ -1064,33 +1264,21 @@ class InstrumentAgent(Process):
             'transaction_id': transaction_id)}
         @retval ACK message containing a dict
             {'success': success, 'result': command-specific,
-            'transaction_id': transaction_id}.
+            'transaction_id': transaction_id}. The result of a TRANSITION
+            command is the agent state after the transition, so callers need
+            no separate status request to check it.
         """
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('command' in content), 'Expected a command.'
-        assert('transaction_id' in content),'Expected a transaction_id.'
-
-        cmd = content['command']
-        tid = content['transaction_id']
-
-        assert(isinstance(cmd, (tuple, list))), 'Expected a command \
-            list or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
+        (cmd, tid) = _validate_content(content, *command_fields)
 
         # Set up the transaction.
-        success = yield self._verify_transaction(tid, 'execute')
+        (success, reply) = self._begin_op(tid, 'execute')
         if InstErrorCode.is_error(success):
-            reply['success'] = success
             yield self.reply_ok(msg, reply)
             return
 
-        reply['transaction_id'] = self.transaction_id
-
         success = None
         result = None
 
@@ -1103,11 +1291,12 @@ class InstrumentAgent(Process):
                     success = InstErrorCode.REQUIRED_PARAMETER
 
                 # Verify required parameter valid.
-                elif not AgentEvent.has(cmd[1]):
+                elif cmd[1] not in agent_events:
                     success = InstErrorCode.INVALID_PARAM_VALUE
 
                 else:
                     (success, result) = yield self._fsm.on_event_async(cmd[1])
+                    result = self._fsm.get_current_state()
 
             # TRANSMIT DATA command.
             elif cmd[0] == AgentCommand.TRANSMIT_DATA:
@@ -1140,23 +1329,17 @@ class InstrumentAgent(Process):
         # Set reply values.
         else:
             reply['success'] = success
+            reply['result'] = result
 
         # Publish errors, clean up transaction.
         finally:
 
             if success == None:
-                desc_str = 'Error in op_execute_observatory: ' + \
-                    InstErrorCode.get_string(InstErrorCode.UNKNOWN_ERROR)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error('op_execute_observatory',
+                                             InstErrorCode.UNKNOWN_ERROR)
 
             elif InstErrorCode.is_error(success):
-                desc_str = 'Error in op_execute_observatory: ' + \
-                    InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error('op_execute_observatory', success)
 
             if (tid == 'create') or (self._transaction_timed_out == True):
                 self._end_transaction(self.transaction_id)
@@ -1175,87 +1358,33 @@ class InstrumentAgent(Process):
             param_arg: (success, val)}, 'transaction_id': transaction_id)
         """
         self._in_protected_function = True
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
-        params = content['params']
-        tid = content['transaction_id']
-        assert(isinstance(params, (tuple, list))), 'Expected a parameter \
-            list or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'get')
+        (params, tid) = _validate_content(content, *params_list_fields)
+        # Set up the transaction.
+        (success, reply) = self._begin_op(tid, 'get')
         if InstErrorCode.is_error(success):
-            reply['success'] = success
             yield self.reply_ok(msg, reply)
             return
 
-        reply['transaction_id'] = self.transaction_id
         result = {}
         get_errors = False
 
         try:
+            # Snapshot the agent parameters once per request rather than
+            # testing each param against every parameter name.
+            param_vals = self._get_parameters()
+
             # Add each observatory parameter given in params list.
             for arg in params:
-                if not AgentParameter.has(arg):
+                if arg not in agent_params:
                     result[arg] = (InstErrorCode.INVALID_PARAMETER, None)
                     get_errors = True
                     continue
 
-                if arg == AgentParameter.EVENT_PUBLISHER_ORIGIN or \
-                    arg == AgentParameter.ALL:
-                    if self.event_publisher_origin == None:
-                        result[AgentParameter.EVENT_PUBLISHER_ORIGIN] = \
-                            (InstErrorCode.OK, None)
-                    else:
-                        result[AgentParameter.EVENT_PUBLISHER_ORIGIN] = \
-                            (InstErrorCode.OK, self.event_publisher_origin)
-
-                if arg == AgentParameter.DRIVER_DESC or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.DRIVER_DESC] = \
-                        (InstErrorCode.OK, self._driver_desc)
-
-                if arg == AgentParameter.DRIVER_CLIENT_DESC or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.DRIVER_CLIENT_DESC] = \
-                        (InstErrorCode.OK, self._client_desc)
-
-                if arg == AgentParameter.DRIVER_CONFIG or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.DRIVER_CONFIG] = \
-                        (InstErrorCode.OK, self._driver_config)
-
-                if arg == AgentParameter.TIME_SOURCE or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.TIME_SOURCE] = \
-                        (InstErrorCode.OK, self._time_source)
-
-                if arg == AgentParameter.CONNECTION_METHOD or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.CONNECTION_METHOD] = \
-                        (InstErrorCode.OK, self._connection_method)
-
-                if arg == AgentParameter.MAX_ACQ_TIMEOUT or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.MAX_ACQ_TIMEOUT] = \
-                        (InstErrorCode.OK, self._max_acq_timeout)
-
-                if arg == AgentParameter.DEFAULT_EXP_TIMEOUT or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.DEFAULT_EXP_TIMEOUT] = \
-                        (InstErrorCode.OK, self._default_exp_timeout)
-
-                if arg == AgentParameter.MAX_EXP_TIMEOUT or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.MAX_EXP_TIMEOUT] = \
-                        (InstErrorCode.OK, self._max_exp_timeout)
-
-                if arg == AgentParameter.BUFFER_SIZE or \
-                    arg == AgentParameter.ALL:
-                    result[AgentParameter.BUFFER_SIZE] = \
-                        (InstErrorCode.OK, self._data_buffer_limit)
+                if arg == AgentParameter.ALL:
+                    for (key, val) in param_vals.iteritems():
+                        result[key] = (InstErrorCode.OK, val)
+                else:
+                    result[arg] = (InstErrorCode.OK, param_vals[arg])
 
         # Unknown error.
         except:
@@ -1278,11 +1407,7 @@ class InstrumentAgent(Process):
 
             # Publish any errors.
             if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_get_observatory: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error('op_get_observatory', success)
 
             # Transaction clean up. End implicit or expired transactions.
             if (tid == 'create') or (self._transaction_timed_out == True):
@@ -1305,26 +1430,14 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
-
-        params = content['params']
-        tid = content['transaction_id']
+        (params, tid) = _validate_content(content, *params_dict_fields)
 
-        assert(isinstance(params, dict)), 'Expected a parameter dict.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'set')
+        # Set up the transaction.
+        (success, reply) = self._begin_op(tid, 'set')
         if InstErrorCode.is_error(success):
-            reply['success'] = success
             yield self.reply_ok(msg, reply)
             return
 
-        reply['transaction_id'] = self.transaction_id
         result = {}
         set_errors = False
         set_successes = False
@@ -1335,7 +1448,7 @@ class InstrumentAgent(Process):
             # Note: it seems like all the current params should be read only by
             # general agent users.
             for arg in params.keys():
-                if not AgentParameter.has(arg):
+                if arg not in agent_params:
                     result[arg] = InstErrorCode.INVALID_PARAMETER
                     set_errors = True
                     continue
@@ -1468,11 +1581,7 @@ class InstrumentAgent(Process):
 
             # Publish any errors.
             if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_set_observatory: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error('op_set_observatory', success)
 
             # Publish the new agent configuration.
             if set_successes:
@@ -1504,28 +1613,14 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
+        (params, tid) = _validate_content(content, *params_list_fields)
 
-        params = content['params']
-        tid = content['transaction_id']
-
-        assert(isinstance(params, (tuple, list))), 'Expected a parameter \
-            list or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'get')
+        # Set up the transaction.
+        (success, reply) = self._begin_op(tid, 'get')
         if InstErrorCode.is_error(success):
-            reply['success'] = success
             yield self.reply_ok(msg, reply)
             return
 
-        reply['transaction_id'] = self.transaction_id
-
         try:
             pass
 
@@ -1544,11 +1639,8 @@ class InstrumentAgent(Process):
 
             # Publish any errors.
             if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_get_observatory_metadata: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error('op_get_observatory_metadata',
+                                             success)
 
             if (tid == 'create') or (self._transaction_timed_out == True):
                 self._end_transaction(self.transaction_id)
@@ -1569,79 +1661,70 @@ class InstrumentAgent(Process):
         """
 
         self._in_protected_function = True
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
-
-        params = content['params']
-        tid = content['transaction_id']
-
-        assert(isinstance(params, (tuple, list))), 'Expected a parameter \
-            list or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
+        (params, tid) = _validate_content(content, *params_list_fields)
 
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'get')
+        # Set up the transaction.
+        (success, reply) = self._begin_op(tid, 'get')
         if InstErrorCode.is_error(success):
-            reply['success'] = success
             yield self.reply_ok(msg, reply)
             return
 
-        reply['transaction_id'] = self.transaction_id
         get_errors = False
         result = {}
 
         try:
 
-            # Set up the result message.
+            # Collect the requested status keys, then fill each one once.
+            keys = set()
             for arg in params:
 
                 # If status key not recognized, report error.
-                if not AgentStatus.has(arg):
+                if arg not in agent_statuses:
                     result[arg] = (InstErrorCode.INVALID_STATUS, None)
                     get_errors = True
-                    continue
 
-                # Agent state.
-                if arg == AgentStatus.AGENT_STATE or arg == AgentStatus.ALL:
-                    result[AgentStatus.AGENT_STATE] = \
-                        (InstErrorCode.OK, self._fsm.get_current_state())
-
-                # Connection state.
-                if arg == AgentStatus.CONNECTION_STATE or arg == \
-                    AgentStatus.ALL:
-                    result[AgentStatus.CONNECTION_STATE] = \
-                        (InstErrorCode.OK, self._get_connection_state())
-
-                # Alarm conditions.
-                if arg == AgentStatus.ALARMS or arg == AgentStatus.ALL:
-                    result[AgentStatus.ALARMS] = \
-                        (InstErrorCode.OK, self._alarms)
-
-                # Time status.
-                if arg == AgentStatus.TIME_STATUS or arg == AgentStatus.ALL:
-                    result[AgentStatus.TIME_STATUS] = \
-                        (InstErrorCode.OK, self._time_status)
-
-                # Data buffer size.
-                if arg == AgentStatus.BUFFER_SIZE or arg == AgentStatus.ALL:
-                    result[AgentStatus.BUFFER_SIZE] = \
-                        (InstErrorCode.OK, self._get_buffer_size())
-
-                # Agent software version.
-                if arg == AgentStatus.AGENT_VERSION or arg == AgentStatus.ALL:
-                    result[AgentStatus.AGENT_VERSION] = \
-                        (InstErrorCode.OK, self.get_version())
-
-                # Pending transactions.
-                if arg == AgentStatus.PENDING_TRANSACTIONS or arg == \
-                    AgentStatus.ALL:
-                    pending_transaction_pids = \
-                        [item[3] for item in self._pending_transactions]
-                    result[AgentStatus.PENDING_TRANSACTIONS] = \
-                        (InstErrorCode.OK, pending_transaction_pids)
+                elif arg == AgentStatus.ALL:
+                    keys.update(agent_statuses)
+
+                else:
+                    keys.add(arg)
+
+            # Agent state.
+            if AgentStatus.AGENT_STATE in keys:
+                result[AgentStatus.AGENT_STATE] = \
+                    (InstErrorCode.OK, self._fsm.get_current_state())
+
+            # Connection state.
+            if AgentStatus.CONNECTION_STATE in keys:
+                result[AgentStatus.CONNECTION_STATE] = \
+                    (InstErrorCode.OK, self._get_connection_state())
+
+            # Alarm conditions.
+            if AgentStatus.ALARMS in keys:
+                result[AgentStatus.ALARMS] = \
+                    (InstErrorCode.OK, self._alarms)
+
+            # Time status.
+            if AgentStatus.TIME_STATUS in keys:
+                result[AgentStatus.TIME_STATUS] = \
+                    (InstErrorCode.OK, self._time_status)
+
+            # Data buffer size.
+            if AgentStatus.BUFFER_SIZE in keys:
+                result[AgentStatus.BUFFER_SIZE] = \
+                    (InstErrorCode.OK, self._get_buffer_size())
+
+            # Agent software version.
+            if AgentStatus.AGENT_VERSION in keys:
+                result[AgentStatus.AGENT_VERSION] = \
+                    (InstErrorCode.OK, self.get_version())
+
+            # Pending transactions.
+            if AgentStatus.PENDING_TRANSACTIONS in keys:
+                pending_transaction_pids = \
+                    [item[3] for item in self._pending_transactions]
+                result[AgentStatus.PENDING_TRANSACTIONS] = \
+                    (InstErrorCode.OK, pending_transaction_pids)
 
         # Unknown error.
         except:
@@ -1663,11 +1746,8 @@ class InstrumentAgent(Process):
 
             # Publish any errors.
             if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_get_observatory_status: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error('op_get_observatory_status',
+                                             success)
 
             if (tid == 'create') or (self._transaction_timed_out == True):
                 self._end_transaction(self.transaction_id)
@@ -1690,134 +1770,43 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
+        (params, tid) = _validate_content(content, *params_list_fields)
 
-        params = content['params']
-        tid = content['transaction_id']
-
-        assert(isinstance(params, (tuple, list))), 'Expected a parameter list \
-            or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'get')
+        # Set up the transaction.
+        (success, reply) = self._begin_op(tid, 'get')
         if InstErrorCode.is_error(success):
-            reply['success'] = success
             yield self.reply_ok(msg, reply)
             return
 
-        reply['transaction_id'] = self.transaction_id
         get_errors = False
         result = {}
 
         try:
 
-            # Do the work here.
-            # Set up the result message.
+            # Collect the requested capabilities, expanding the ALL groups.
+            keys = set()
             for arg in params:
-                if not InstrumentCapability.has(arg):
+                if arg not in instrument_capabilities:
                     result[arg] = (InstErrorCode.INVALID_CAPABILITY, None)
                     get_errors = True
-                    continue
+                else:
+                    keys.update(capability_groups.get(arg, (arg,)))
 
-                if ObservatoryCapability.has(arg) or arg == \
-                    InstrumentCapability.ALL:
-
-                    if arg == InstrumentCapability.OBSERVATORY_COMMANDS or \
-                            arg == InstrumentCapability.OBSERVATORY_ALL or \
-                            arg == InstrumentCapability.ALL:
-                        result[InstrumentCapability.OBSERVATORY_COMMANDS] = \
-                            (InstErrorCode.OK, AgentCommand.list())
-
-                    if arg == InstrumentCapability.OBSERVATORY_PARAMS or \
-                            arg == InstrumentCapability.OBSERVATORY_ALL or \
-                            arg == InstrumentCapability.ALL:
-                        result[InstrumentCapability.OBSERVATORY_PARAMS] = \
-                            (InstErrorCode.OK, AgentParameter.list())
-
-                    if arg == InstrumentCapability.OBSERVATORY_STATUSES or \
-                            arg == InstrumentCapability.OBSERVATORY_ALL or \
-                            arg == InstrumentCapability.ALL:
-                        result[InstrumentCapability.OBSERVATORY_STATUSES] = \
-                            (InstErrorCode.OK, AgentStatus.list())
-
-                    if arg == InstrumentCapability.OBSERVATORY_METADATA or \
-                            arg == InstrumentCapability.OBSERVATORY_ALL or \
-                            arg == InstrumentCapability.ALL:
-                        result[InstrumentCapability.OBSERVATORY_METADATA] = \
-                            (InstErrorCode.OK, MetadataParameter.list())
-
-                if DriverCapability.has(arg) or arg == \
-                    InstrumentCapability.ALL:
-
-                    if arg == InstrumentCapability.DEVICE_CHANNELS or \
-                           arg == InstrumentCapability.DEVICE_ALL or \
-                           arg == InstrumentCapability.ALL:
-                        val = self._device_capabilities.\
-                              get(InstrumentCapability.DEVICE_CHANNELS, None)
-                        if val != None:
-                            result[InstrumentCapability.DEVICE_CHANNELS] = \
-                                (InstErrorCode.OK, val)
-                        else:
-                            result[InstrumentCapability.DEVICE_CHANNELS] = \
-                                (InstErrorCode.INVALID_CAPABILITY, None)
-                            get_errors = True
-
-                    if arg == InstrumentCapability.DEVICE_COMMANDS or \
-                           arg == InstrumentCapability.DEVICE_ALL or \
-                           arg == InstrumentCapability.ALL:
-                        val = self._device_capabilities.\
-                              get(InstrumentCapability.DEVICE_COMMANDS, None)
-                        if val != None:
-                            result[InstrumentCapability.DEVICE_COMMANDS] = \
-                                (InstErrorCode.OK, val)
-                        else:
-                            result[InstrumentCapability.DEVICE_COMMANDS] = \
-                                (InstErrorCode.INVALID_CAPABILITY, None)
-                            get_errors = True
-
-                    if arg == InstrumentCapability.DEVICE_METADATA or \
-                           arg == InstrumentCapability.DEVICE_ALL or \
-                           arg == InstrumentCapability.ALL:
-                        val = self._device_capabilities.\
-                              get(InstrumentCapability.DEVICE_METADATA, None)
-                        if val != None:
-                            result[InstrumentCapability.DEVICE_METADATA] = \
-                                (InstErrorCode.OK, val)
-                        else:
-                            result[InstrumentCapability.DEVICE_METADATA] = \
-                                (InstErrorCode.INVALID_CAPABILITY, None)
-                            get_errors = True
-
-                    if arg == InstrumentCapability.DEVICE_PARAMS or \
-                           arg == InstrumentCapability.DEVICE_ALL or \
-                           arg == InstrumentCapability.ALL:
-                        val = self._device_capabilities.\
-                              get(InstrumentCapability.DEVICE_PARAMS, None)
-                        if val != None:
-                            result[InstrumentCapability.DEVICE_PARAMS] = \
-                                (InstErrorCode.OK, val)
-                        else:
-                            result[InstrumentCapability.DEVICE_PARAMS] = \
-                                (InstErrorCode.INVALID_CAPABILITY, None)
-                            get_errors = True
-
-                    if arg == InstrumentCapability.DEVICE_STATUSES or \
-                           arg == InstrumentCapability.DEVICE_ALL or \
-                           arg == InstrumentCapability.ALL:
-                        val = self._device_capabilities.\
-                              get(InstrumentCapability.DEVICE_STATUSES, None)
-                        if val != None:
-                            result[InstrumentCapability.DEVICE_STATUSES] = \
-                                (InstErrorCode.OK, val)
-                        else:
-                            result[InstrumentCapability.DEVICE_STATUSES] = \
-                                (InstErrorCode.INVALID_CAPABILITY, None)
-                            get_errors = True
+            for key in keys:
+
+                # Observatory capabilities are the agent enum values.
+                if key in observatory_capability_values:
+                    result[key] = (InstErrorCode.OK,
+                                   observatory_capability_values[key])
+
+                # Device capabilities are read from the driver.
+                else:
+                    val = self._device_capabilities.get(key, None)
+                    if val != None:
+                        result[key] = (InstErrorCode.OK, val)
+                    else:
+                        result[key] = (InstErrorCode.INVALID_CAPABILITY, None)
+                        get_errors = True
 
         # Unkonwn error.
         except:
@@ -1839,11 +1828,7 @@ class InstrumentAgent(Process):
 
             # Publish any errors.
             if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_get_observatory_capabilities: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error('op_get_capabilities', success)
 
             if (tid == 'create') or (self._transaction_timed_out == True):
                 self._end_transaction(self.transaction_id)
@@ -1855,7 +1840,6 @@ class InstrumentAgent(Process):
     #   Instrument Facing Interface
     ###########################################################################
 
-    @defer.inlineCallbacks
     def op_execute_device(self, content, headers, msg):
         """
         Execute a command on the device fronted by the agent. Commands may be
@@ -1874,77 +1858,13 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('channels' in content), 'Expected channels.'
-        assert('command' in content), 'Expected command.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
-
-        channels = content['channels']
-        command = content['command']
-        tid = content['transaction_id']
-
-        assert(isinstance(channels, (tuple, list))), 'Expected a channels \
-            list or tuple.'
-        assert(isinstance(command, (tuple, list))), 'Expected a command list \
-            or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'execute')
-        if InstErrorCode.is_error(success):
-            reply['success'] = success
-            yield self.reply_ok(msg, reply)
-            return
-
-        reply['transaction_id'] = self.transaction_id
-
-        agent_state = self._fsm.get_current_state()
-        if agent_state != AgentState.OBSERVATORY_MODE:
-            reply['success'] = InstErrorCode.INCORRECT_STATE
-            yield self.reply_ok(msg, reply)
-            return
-
-        timeout = 60
-        success = None
-        result = None
-
-        try:
-
-            dvr_result = yield self._driver_client.execute(channels, command,
-                                                          timeout)
-            success = dvr_result.get('success', None)
-            result = dvr_result.get('result', None)
-
-        # Unknown error.
-        except:
-            success = InstErrorCode.UNKNOWN_ERROR
-            raise
+        (channels, command, tid) = _validate_content(content,
+                                                     *channels_command_fields)
 
-        # Set reply values.
-        else:
-            reply['success'] = success
-            reply['result'] = result
+        return self._device_op(msg, 'op_execute_device', tid, 'execute',
+                               observatory_states, 'execute',
+                               (channels, command))
 
-        # Publish errors, clean up transaction.
-        finally:
-
-            # Publish any errors.
-            if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_execute_device: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin\
-                                            =origin, description=desc_str)
-
-            if (tid == 'create') or (self._transaction_timed_out == True):
-                self._end_transaction(self.transaction_id)
-            self._in_protected_function = False
-
-        yield self.reply_ok(msg, reply)
-
-    @defer.inlineCallbacks
     def op_get_device(self, content, headers, msg):
         """
         Get configuration parameters from the instrument.
@@ -1959,153 +1879,37 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
+        (params, tid) = _validate_content(content, *params_list_fields)
 
-        params = content['params']
-        tid = content['transaction_id']
+        return self._device_op(msg, 'op_get_device', tid, 'get',
+                               device_get_states, 'get', (params,))
 
-        assert(isinstance(params, (tuple, list))), 'Expected a parameter \
-            list or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'get')
-        if InstErrorCode.is_error(success):
-            reply['success'] = success
-            yield self.reply_ok(msg, reply)
-            return
-
-        reply['transaction_id'] = self.transaction_id
-
-        agent_state = self._fsm.get_current_state()
-        if agent_state != AgentState.OBSERVATORY_MODE and \
-                          agent_state != AgentState.IDLE and \
-                          agent_state != AgentState.STOPPED:
-            reply['success'] = InstErrorCode.INCORRECT_STATE
-            yield self.reply_ok(msg, reply)
-            return
-
-        timeout = 60
-        success = None
-        result = None
-
-        try:
-
-            dvr_result = yield self._driver_client.get(params,timeout)
-            success = dvr_result.get('success', None)
-            result = dvr_result.get('result', None)
-            #pass
-
-        # Unkonwn error.
-        except:
-            success = InstErrorCode.UNKNOWN_ERROR
-            raise
-
-        # Set reply values.
-        else:
-            reply['success'] = success
-            reply['result'] = result
-            #reply['success'] = InstErrorCode.OK
-            #reply['result'] = {'parameter': (InstErrorCode.OK, 'value')}
-
-        # Publish errors, clean up transaction.
-        finally:
-
-            if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_get_device: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
-
-            if (tid == 'create') or (self._transaction_timed_out == True):
-                self._end_transaction(self.transaction_id)
-            self._in_protected_function = False
-
-        yield self.reply_ok(msg, reply)
-
-    @defer.inlineCallbacks
     def op_set_device(self, content, headers, msg):
         """
         Set parameters to the instrument side of of the agent.
         @param content A dict {'params': {(chan_arg, param_arg): val, ...,
-            (chan_arg, param_arg): val}, 'transaction_id': transaction_id}.
+            (chan_arg, param_arg): val}, 'transaction_id': transaction_id},
+            with an optional 'verify' flag.
         @retval Reply message with a dict
             {'success': success, 'result': {(chan_arg, param_arg): success,
             ..., chan_arg, param_arg): success},
-            'transaction_id': transaction_id}.
+            'transaction_id': transaction_id}. With verify set, the
+            parameters are read back after the set and the result is as for
+            op_get_device.
         """
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
-
-        params = content['params']
-        tid = content['transaction_id']
+        (params, tid) = _validate_content(content, *params_dict_fields)
 
-        assert(isinstance(params, dict)), 'Expected a parameter dict.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'set')
-        if InstErrorCode.is_error(success):
-            reply['success'] = success
-            yield self.reply_ok(msg, reply)
-            return
-
-        reply['transaction_id'] = self.transaction_id
-
-        agent_state = self._fsm.get_current_state()
-        if agent_state != AgentState.OBSERVATORY_MODE:
-            reply['success'] = InstErrorCode.INCORRECT_STATE
-            yield self.reply_ok(msg, reply)
-            return
-
-        timeout = 60
-        success = None
-        result = None
-
-        try:
-
-            dvr_result = yield self._driver_client.set(params,timeout)
-            success = dvr_result.get('success', None)
-            result = dvr_result.get('result', None)
-
-        # Unknown error.
-        except:
-            success = InstErrorCode.UNKNOWN_ERROR
-            raise
-
-        # Set reply values.
+        if content.get('verify', False):
+            driver_op = 'set_verify'
         else:
-            reply['success'] = success
-            reply['result'] = result
-
-        # Publish errors, clean up transaction.
-        finally:
-
-            if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_execute_device: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
-
-            if (tid == 'create') or (self._transaction_timed_out == True):
-                self._end_transaction(self.transaction_id)
-            self._in_protected_function = False
+            driver_op = 'set'
 
-        yield self.reply_ok(msg, reply)
+        return self._device_op(msg, 'op_set_device', tid, 'set',
+                               observatory_states, driver_op, (params,))
 
-    @defer.inlineCallbacks
     def op_execute_device_direct(self, content, headers, msg):
         """
         Execute untranslated byte data commands on the device.
@@ -2116,72 +1920,12 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('bytes' in content), 'Expected bytes.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
+        (bytes, tid) = _validate_content(content, *bytes_fields)
 
-        bytes = content['bytes']
-        tid = content['transaction_id']
-
-        assert(isinstance(bytes, str)), 'Expected a bytes string.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'execute')
-        if InstErrorCode.is_error(success):
-            reply['success'] = success
-            yield self.reply_ok(msg, reply)
-            return
-
-        reply['transaction_id'] = self.transaction_id
-
-        agent_state = self._fsm.get_current_state()
-        if agent_state != AgentState.DIRECT_ACCESS_MODE:
-            reply['success'] = InstErrorCode.INCORRECT_STATE
-            yield self.reply_ok(msg, reply)
-            return
-
-        timeout = 60
-        success = None
-        result = None
-
-        try:
-
-            dvr_result = yield self._driver_client.execute_direct(bytes,
-                                                                  timeout)
-            success = dvr_result.get('success', None)
-            result = dvr_result.get('result', None)
-
-        # Unknown error.
-        except:
-            success = InstErrorCode.UNKOWN_ERROR
-            raise
-
-        # Set reply values.
-        else:
-            reply['success'] = success
-            reply['result'] = result
-
-        # Publish errors, clean up transaction.
-        finally:
-
-            # Publish any errors.
-            if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_execute_device_direct: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
-
-            if (tid == 'create') or (self._transaction_timed_out == True):
-                self._end_transaction(self.transaction_id)
-            self._in_protected_function = False
-
-        yield self.reply_ok(msg, reply)
+        return self._device_op(msg, 'op_execute_device_direct', tid,
+                               'execute', direct_access_states,
+                               'execute_direct', (bytes,))
 
-    @defer.inlineCallbacks
     def op_get_device_metadata(self, content, headers, msg):
         """
         Retrieve metadata for the device, its transducers and parameters.
@@ -2196,75 +1940,12 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
-
-        params = content['params']
-        tid = content['transaction_id']
-
-        assert(isinstance(params, (tuple, list))), 'Expected a parameter \
-            list or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
-
-        reply = {'success': None, 'result': None, 'transaction_id': None}
-
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'get')
-        if InstErrorCode.is_error(success):
-            reply['success'] = success
-            yield self.reply_ok(msg, reply)
-            return
-
-        reply['transaction_id'] = self.transaction_id
+        (params, tid) = _validate_content(content, *params_list_fields)
 
-        agent_state = self._fsm.get_current_state()
-        if agent_state != AgentState.OBSERVATORY_MODE and \
-                          agent_state != AgentState.IDLE and \
-                          agent_state != AgentState.STOPPED:
-            reply['success'] = InstErrorCode.INCORRECT_STATE
-            yield self.reply_ok(msg, reply)
-            return
+        return self._device_op(msg, 'op_get_device_metadata', tid, 'get',
+                               device_get_states, 'get_metadata',
+                               ({'params': params},), reraise=False)
 
-        timeout = 60
-        success = None
-        result = None
-
-        try:
-
-            dvr_content = {'params': params}
-            dvr_result = yield self._driver_client.get_metadata(dvr_content,
-                                                                timeout)
-            success = dvr_result.get('success', None)
-            result = dvr_result.get('result', None)
-
-        # Unkown error.
-        except:
-            success = InstErrorCode.UNKNOWN_ERROR
-
-        # Set reply values.
-        else:
-            reply['success'] = success
-            reply['result'] = result
-
-        # Publish errors, clean up transaction.
-        finally:
-
-            # Publish any errors.
-            if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_get_device_metadata: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
-
-            if (tid == 'create') or (self._transaction_timed_out == True):
-                self._end_transaction(self.transaction_id)
-            self._in_protected_function = False
-
-        yield self.reply_ok(msg, reply)
-
-    @defer.inlineCallbacks
     def op_get_device_status(self, content, headers, msg):
         """
         Obtain the status of an instrument. This includes non-parameter
@@ -2280,51 +1961,64 @@ class InstrumentAgent(Process):
 
         self._in_protected_function = True
 
-        assert(isinstance(content, dict)), 'Expected a dict content.'
-        assert('params' in content), 'Expected params.'
-        assert('transaction_id' in content), 'Expected a transaction_id.'
-
-        params = content['params']
-        tid = content['transaction_id']
+        (params, tid) = _validate_content(content, *params_list_fields)
 
-        assert(isinstance(params, (tuple, list))), 'Expected a parameter \
-            list or tuple.'
-        assert(isinstance(tid, str)), 'Expected a transaction_id str.'
+        return self._device_op(msg, 'op_get_device_status', tid, 'get',
+                               device_get_states, 'get_status',
+                               ({'params': params},), reraise=False)
 
-        reply = {'success': None, 'result': None, 'transaction_id': None}
+    def _device_op(self, msg, op, tid, optype, states, driver_op, args,
+                   reraise=True):
+        """
+        Run a device op through the driver client and reply to the op
+        message. Shared by the instrument facing ops. Ops rejected for the
+        transaction or agent state are replied to directly.
+        @param msg The op message to reply to.
+        @param op The op name used in published errors.
+        @param tid The transaction ID given to the op.
+        @param optype 'get' 'set' or 'execute'
+        @param states The agent states the op is allowed in.
+        @param driver_op The name of the driver client method to call.
+        @param args A tuple of arguments to the driver client method.
+        @param reraise If False, driver errors are reported in the reply
+            rather than raised.
+        @retval A deferred firing when the reply is sent.
+        """
 
-        # Set up the transaction
-        success = yield self._verify_transaction(tid, 'get')
+        # Set up the transaction.
+        (success, reply) = self._begin_op(tid, optype)
         if InstErrorCode.is_error(success):
-            reply['success'] = success
-            yield self.reply_ok(msg, reply)
-            return
-
-        reply['transaction_id'] = self.transaction_id
+            return self.reply_ok(msg, reply)
 
-        agent_state = self._fsm.get_current_state()
-        if agent_state != AgentState.OBSERVATORY_MODE and \
-                          agent_state != AgentState.IDLE and \
-                          agent_state != AgentState.STOPPED:
+        if self._fsm.get_current_state() not in states:
+            self._in_protected_function = False
             reply['success'] = InstErrorCode.INCORRECT_STATE
-            yield self.reply_ok(msg, reply)
-            return
+            return self.reply_ok(msg, reply)
+
+        return self._run_device_op(msg, op, tid, reply, driver_op, args,
+                                   reraise)
 
-        timeout = 60
+    @defer.inlineCallbacks
+    def _run_device_op(self, msg, op, tid, reply, driver_op, args, reraise):
+        """
+        Call the driver client for an accepted device op and reply.
+        @see _device_op
+        """
         success = None
         result = None
 
         try:
 
-            dvr_content = {'params': params}
-            dvr_result = yield self._driver_client.get_status(dvr_content,
-                                                              timeout)
+            dvr_result = yield getattr(self._driver_client, driver_op)(*args,
+                                                                 timeout=60)
             success = dvr_result.get('success', None)
             result = dvr_result.get('result', None)
 
         # Unknown error.
         except:
             success = InstErrorCode.UNKNOWN_ERROR
+            if reraise:
+                raise
 
         # Set reply values.
         else:
@@ -2336,11 +2030,7 @@ class InstrumentAgent(Process):
 
             # Publish any errors.
             if InstErrorCode.is_error(success):
-                desc_str = 'Error in op_get_device_metadata: ' + \
-                           InstErrorCode.get_string(success)
-                origin = "agent.%s" % self.event_publisher_origin
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=desc_str)
+                yield self._publish_op_error(op, success)
 
             if (tid == 'create') or (self._transaction_timed_out == True):
                 self._end_transaction(self.transaction_id)
@@ -2362,99 +2052,168 @@ class InstrumentAgent(Process):
         @param content a dict with 'type' and 'transducer' strings and 'value'
             object.
         """
-        log.debug("op_driver_event_occurred begins")
-        assert isinstance(content, dict), 'Expected a content dict.'
-
-        type = content.get('type', None)
-        transducer = content.get('transducer', None)
+        # Checked once, this op runs for every sample the driver reads.
+        debug = log.getEffectiveLevel() <= logging.DEBUG
+        if debug:
+            log.debug("op_driver_event_occurred begins")
+        (type, transducer) = _validate_content(content, *driver_event_fields)
         value = content.get('value', None)
-
-        assert isinstance(type, str), 'Expected a type string.'
-        assert isinstance(transducer, str), 'Expected a transducer string.'
-        assert value != None, 'Expected a value.'
+        if value == None:
+            raise ApplicationError('Expected a value.', 400)
 
         if not (self._is_child_process(headers['sender-name'])):
             yield self.reply_err(msg,
                         'driver event occured evoked from a non-child process')
             return
 
-        # If data received, coordinate buffering and publishing.
-        if type == DriverAnnouncement.DATA_RECEIVED:
-            # Remember the transducer in case we need to transmit at a time
-            # other than these events.
-            self._prev_data_transducer = transducer
+        # Data, config and state change announcements have a handler, the
+        # other announcement types need no action.
+        handler = driver_event_handlers.get(type)
+        if handler != None:
+            yield getattr(self, handler)(transducer, value, debug)
 
-            # Get the driver observatory state.
-            key = (DriverChannel.INSTRUMENT, DriverStatus.OBSERVATORY_STATE)
-            reply = yield self._driver_client.get_status([key])
-            success = reply['success']
-            result = reply['result']
-            obs_status = result.get(key, None)
-            json_val = None
-
-            # If in streaming mode, buffer data and publish at intervals.
-            if InstErrorCode.is_ok(success) and obs_status != None:
-                if obs_status[1] == ObservatoryState.STREAMING:
-                    self._data_buffer.append(value)
-                    if len(self._data_buffer) > self._data_buffer_limit:
-                        # strval = self._get_data_string(self._data_buffer)
-                        json_val = json.dumps(self._data_buffer)
-                        self._data_buffer = []
-
-                # If not in streaming mode, always publish data upon receipt.
-                else:
-                    #strval = self._get_data_string(value)
-                    json_val = json.dumps([value])
+        if debug:
+            self._debug_print_driver_event(type, transducer, value)
 
-            #if len(strval) > 0:
-            if json_val != None:
-                origin = "%s.%s" % (transducer, self.event_publisher_origin)
+
+    @defer.inlineCallbacks
+    def _driver_data_received(self, transducer, value, debug):
+        """
+        Coordinate buffering and publishing of a data sample.
+        @param transducer The transducer that produced the sample.
+        @param value The sample value.
+        @param debug True if debug logging is enabled.
+        """
+        # Remember the transducer in case we need to transmit at a time
+        # other than these events.
+        self._prev_data_transducer = transducer
+
+        # Get the driver observatory state.
+        reply = yield self._driver_client.get_status([observatory_state_key])
+        success = reply['success']
+        result = reply['result']
+        obs_status = result.get(observatory_state_key, None)
+        json_val = None
+
+        # If in streaming mode, buffer data and publish at intervals.
+        if InstErrorCode.is_ok(success) and obs_status != None:
+            if obs_status[1] == ObservatoryState.STREAMING:
+                self._data_buffer.append(value)
+                if len(self._data_buffer) > self._data_buffer_limit:
+                    # strval = self._get_data_string(self._data_buffer)
+                    json_val = json.dumps(self._data_buffer)
+                    self._data_buffer = []
+
+            # If not in streaming mode, always publish data upon receipt.
+            # Samples arriving in the same reactor iteration go out as
+            # one data event.
+            else:
+                yield self._queue_data(transducer, value)
+
+        #if len(strval) > 0:
+        if json_val != None:
+            (publish, origin) = self._get_publish_target('data', transducer)
+            if debug:
                 log.debug("Instrument Agent publishing data: %s on origin: %s", json_val, origin)
-                yield self._data_publisher.create_and_publish_event(\
-                    origin=origin, data_block=json_val)
-                
-        # Driver configuration changed, publish config.
-        elif type == DriverAnnouncement.CONFIG_CHANGE:
-
-            reply = yield self._driver_client.get([(DriverChannel.ALL,
-                                                    DriverParameter.ALL)])
-            success = reply['success']
-            result = reply['result']
-            if InstErrorCode.is_ok(success) and len(result) > 0:
-                str_key_dict = {}
-                for (key, val) in result.iteritems():
-                    str_key = '%s__%s' % (key[0], key[1])
-                    str_key_dict[str_key] = val
-                #strval = self._get_data_string(result)
-                json_val = json.dumps(str_key_dict)
-                origin = "%s.%s" % (transducer, self.event_publisher_origin)
-                yield self._log_publisher.create_and_publish_event(origin=\
-                                            origin, description=json_val)
+            yield publish(origin=origin, data_block=json_val)
 
-        elif type == DriverAnnouncement.ERROR:
-            pass
+    @defer.inlineCallbacks
+    def _driver_config_changed(self, transducer, value, debug):
+        """
+        Publish the driver configuration after a config change.
+        @param transducer The transducer of the announcement.
+        @param value The announcement value.
+        @param debug True if debug logging is enabled.
+        """
+        reply = yield self._driver_client.get([all_params_key])
+        success = reply['success']
+        result = reply['result']
+        if InstErrorCode.is_ok(success) and len(result) > 0:
+            str_key_dict = dict(('%s__%s' % (key[0], key[1]), val)
+                                for (key, val) in result.iteritems())
+            #strval = self._get_data_string(result)
+            json_val = json.dumps(str_key_dict)
+            self._publish_targets = {}
+            (publish, origin) = self._get_publish_target('log', transducer)
+            yield publish(origin=origin, description=json_val)
 
-        # If the driver state changed, publish any buffered data remaining.
-        elif type == DriverAnnouncement.STATE_CHANGE:
-            json_val = None
-            if len(self._data_buffer) > 0:
-                #strval = self._get_data_string(self._data_buffer)
-                json_val = json.dumps(self._data_buffer)
-                #if len(strval) > 0:
-                if json_val != None:
-                    origin = "%s.%s" % (self._prev_data_transducer,
-                                        self.event_publisher_origin)
-                    yield self._log_publisher.create_and_publish_event(origin=\
-                                                origin, description=json_val)
-
-        elif type == DriverAnnouncement.EVENT_OCCURRED:
-            pass
+    @defer.inlineCallbacks
+    def _driver_state_changed(self, transducer, value, debug):
+        """
+        Publish any buffered data remaining after a driver state change.
+        @param transducer The transducer of the announcement.
+        @param value The announcement value.
+        @param debug True if debug logging is enabled.
+        """
+        # Queued samples go out ahead of the state change.
+        if self._data_pending:
+            yield self._flush_data()
 
-        else:
-            pass
+        json_val = None
+        if len(self._data_buffer) > 0:
+            #strval = self._get_data_string(self._data_buffer)
+            json_val = json.dumps(self._data_buffer)
+            #if len(strval) > 0:
+            if json_val != None:
+                (publish, origin) = self._get_publish_target('log',
+                                                self._prev_data_transducer)
+                yield publish(origin=origin, description=json_val)
+
+    def _queue_data(self, transducer, value):
+        """
+        Queue a data sample for publication with the other samples arriving
+        within the data flush delay.
+        @param transducer The transducer that produced the sample.
+        @param value The sample value.
+        @retval A deferred firing when the queue is published if the
+            transducer reached the data flush limit, None otherwise.
+        """
+        values = self._data_pending.setdefault(transducer, [])
+        values.append(value)
+        if len(values) >= self._data_flush_limit:
+            return self._flush_data()
+
+        if self._data_flush_call == None:
+            self._data_flush_call = reactor.callLater(self._data_flush_delay,
+                                                      self._flush_data)
+
+    def _get_publish_target(self, kind, transducer):
+        """
+        Get the publish method and origin for events of a transducer.
+        @param kind The publisher kind, a key of publisher_names.
+        @param transducer The transducer name.
+        @retval A tuple (publish, origin) of the publisher
+            create_and_publish_event method and the origin string
+            'transducer.event_publisher_origin'.
+        """
+        key = (kind, transducer)
+        target = self._publish_targets.get(key)
+        if target == None:
+            publisher = getattr(self, publisher_names[kind])
+            origin = "%s.%s" % (transducer, self.event_publisher_origin)
+            target = (publisher.create_and_publish_event, origin)
+            self._publish_targets[key] = target
+        return target
 
-        self._debug_print_driver_event(type, transducer, value)
+    @defer.inlineCallbacks
+    def _flush_data(self):
+        """
+        Publish the queued data samples, one data event per transducer
+        carrying a json list of the samples.
+        """
+        call = self._data_flush_call
+        if call != None and call.active():
+            call.cancel()
+        self._data_flush_call = None
+        pending = self._data_pending
+        self._data_pending = {}
 
+        for (transducer, values) in pending.iteritems():
+            (publish, origin) = self._get_publish_target('data', transducer)
+            try:
+                yield publish(origin=origin, data_block=json.dumps(values))
+            except Exception:
+                log.exception('Error publishing data on origin %s', origin)
 
     ###########################################################################
     #   Driver lifecycle.
@@ -2519,6 +2278,21 @@ class InstrumentAgent(Process):
                     self._debug_print('constructed driver client',
                                       str(self._driver_client))
 
+    def spawn_child(self, childproc, activate=True):
+        """
+        Spawn a child process and record its name as a child process name.
+        """
+        self._child_proc_names.add(childproc.proc_name)
+        return Process.spawn_child(self, childproc, activate)
+
+    @defer.inlineCallbacks
+    def shutdown_child_procs(self):
+        """
+        Shut down the child processes and drop their recorded names.
+        """
+        yield Process.shutdown_child_procs(self)
+        self._update_child_proc_names()
+
     def _condemn_driver(self):
         """
         Add current driver to a list to be shutdown at a convenient time.
@@ -2543,6 +2317,7 @@ class InstrumentAgent(Process):
             else:
                 new_children.append(item)
         self.child_procs = new_children
+        self._update_child_proc_names()
 
     def _stop_driver(self):
         """
@@ -2560,6 +2335,7 @@ class InstrumentAgent(Process):
                     self.shutdown_child(item)
                     self.child_procs.remove(item)
 
+            self._update_child_proc_names()
             self._driver_pid = None
             self._driver_client = None
 
@@ -2577,25 +2353,7 @@ class InstrumentAgent(Process):
         """
 
         curstate = self._fsm.get_current_state()
-
-        if curstate == AgentState.POWERED_DOWN:
-            return AgentConnectionState.POWERED_DOWN
-        elif curstate == AgentState.UNINITIALIZED:
-            return AgentConnectionState.NO_DRIVER
-        elif curstate == AgentState.INACTIVE:
-            return AgentConnectionState.DISCONNECTED
-        elif curstate == AgentState.IDLE:
-            return AgentConnectionState.CONNECTED
-        elif curstate == AgentState.STOPPED:
-            return AgentConnectionState.CONNECTED
-        elif curstate == AgentState.OBSERVATORY_MODE:
-            return AgentConnectionState.CONNECTED
-        elif curstate == AgentState.DIRECT_ACCESS_MODE:
-            return AgentConnectionState.CONNECTED
-        elif curstate == AgentState.UNKNOWN:
-            return AgentConnectionState.UNKOWN
-        else:
-            return AgentConnectionState.UNKOWN
+        return connection_states.get(curstate, AgentConnectionState.UNKOWN)
 
     def _is_child_process(self, name):
         """
@@ -2603,21 +2361,21 @@ class InstrumentAgent(Process):
         @param name The name to test for subprocess-ness
         @retval True if the name matches a child process name, False otherwise
         """
-        log.debug("__is_child_process looking for process '%s' in %s",
-                  name, self.child_procs)
-        found = False
-        for proc in self.child_procs:
-            if proc.proc_name == name:
-                found = True
-                break
-        return found
+        return name in self._child_proc_names
+
+    def _update_child_proc_names(self):
+        """
+        Rebuild the set of child process names after child_procs is changed.
+        """
+        self._child_proc_names = set([proc.proc_name for proc in
+                                      self.child_procs])
 
     def _get_buffer_size(self):
         """
         Return the total size in characters of the data buffer.
         Assumes the buffer is a list of string data lines.
         """
-        return sum(map(lambda x: len(x), self._data_buffer))
+        return sum(len(x) for x in self._data_buffer)
 
     def _get_data_string(self, data):
         """
@@ -2635,12 +2393,7 @@ class InstrumentAgent(Process):
         if isinstance(data, dict):
             return str(data)
         else:
-            strval = ''
-            for item in data:
-                strval += str(item) + ','
-
-            strval = strval[:-1]
-            return strval
+            return ','.join(str(item) for item in data)
 
     def _get_parameters(self):
         """
@@ -2970,17 +2723,20 @@ class InstrumentAgentClient(ProcessClient):
         defer.returnValue(content)
 
     @defer.inlineCallbacks
-    def set_device(self, params, transaction_id='none'):
+    def set_device(self, params, transaction_id='none', verify=False):
         """
         Set parameters to the instrument side of of the agent.
         @param params A parameter-value dict {(chan_arg, param_arg): val,
         ..., (chan_arg, param_arg): val}.
         @param transaction_id A transaction ID uuid4 or string 'create,'
             or 'none.'
+        @param verify If True, the agent reads the parameters back after
+            the set and returns them, saving a separate get_device call.
         @retval Reply dict
             {'success': success, 'result': {(chan_arg, param_arg): success,
             ..., chan_arg, param_arg): success},
-            'transaction_id': transaction_id}.
+            'transaction_id': transaction_id}. With verify, the result is
+            {(chan_arg, param_arg): (success, val), ...} as for get_device.
         """
         assert(isinstance(params, dict)), 'Expected a parameter-value dict.'
         assert(isinstance(transaction_id, str)), \
@@ -2988,6 +2744,8 @@ class InstrumentAgentClient(ProcessClient):
 
         yield self._check_init()
         content = {'params': params, 'transaction_id': transaction_id}
+        if verify:
+            content['verify'] = True
         (content, headers, messaage) = yield \
             self.rpc_send('set_device', content,
                           timeout=self.default_rpc_timeout)
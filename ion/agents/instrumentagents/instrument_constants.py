@@ -5,19 +5,76 @@
 @brief Constants associated with instrument agents and drivers.
 """
 
+class _BaseEnumMeta(type):
+    """
+    Metaclass for enums. Builds the name to value and value to name maps
+    once when each enum class is defined, so list and has do not walk dir()
+    on every call. Members of base enums are merged in, so derived enums
+    such as InstrumentCapability need no rescan. Name clashes resolve as
+    attribute lookup does: the class's own members win over inherited ones,
+    and bases listed first win over later bases.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        type.__init__(cls, name, bases, namespace)
+
+        # Merge base members in reverse mro order so that nearer classes
+        # win, as getattr would.
+        members = {}
+        for base in reversed(cls.__mro__[1:]):
+            members.update(base.__dict__.get('__enum_members__', {}))
+        for attr in namespace:
+            val = getattr(cls,attr)
+            if not attr.startswith('__') and not callable(val):
+                # Intern string values so state and event comparisons and
+                # dict probes can match on identity. Use the class
+                # attributes rather than building these strings at runtime.
+                if type(val) is str:
+                    val = intern(val)
+                    setattr(cls,attr,val)
+                members[attr] = val
+
+        # Keep the sorted dir() order for list. Some enums have list or
+        # dict values, only hashable values can go in the reverse map.
+        names = {}
+        for attr in sorted(members):
+            try:
+                names.setdefault(members[attr],attr)
+            except TypeError:
+                pass
+
+        cls.__enum_members__ = members
+        cls.__enum_names__ = names
+        cls.__enum_values__ = tuple([members[attr] for attr in \
+                                     sorted(members)])
+
+    def __contains__(cls, item):
+        return cls.has(item)
+
+
 class BaseEnum(object):
     """
     Base class for enums. Used to code agent and instrument
     states, events, commands and errors.
     """
+    __metaclass__ = _BaseEnumMeta
     
     @classmethod
     def list(cls):
         """
-        List the values of this enum.
+        List the values of this enum. Returns a new list, use values where
+        the result is only read.
+        """
+        return list(cls.__enum_values__)
+
+
+    @classmethod
+    def values(cls):
+        """
+        Get the values of this enum, in list order, as a tuple shared by all
+        callers.
         """
-        return [getattr(cls,attr) for attr in dir(cls) if \
-            not callable(getattr(cls,attr)) and not attr.startswith('__')]
+        return cls.__enum_values__
 
 
     @classmethod
@@ -29,7 +86,10 @@ class BaseEnum(object):
         @retval True if one of the class attributes has value item, false
             otherwise.
         """
-        return item in cls.list()
+        try:
+            return item in cls.__enum_names__
+        except TypeError:
+            return item in cls.__enum_values__
 
 
 ###############################################################################
@@ -427,10 +487,31 @@ class MetadataParameter(BaseEnum):
 # Error constants.
 ##############################################################################
 
+class _ErrorCodeMeta(_BaseEnumMeta):
+    """
+    Metaclass for error code enums. Besides the enum maps, builds tables of
+    each class's error codes keyed by code name, the first element of each
+    value, so codes are looked up by name for the class the test is called
+    on, including subclasses such as NMEAErrorCode.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        _BaseEnumMeta.__init__(cls, name, bases, namespace)
+
+        # List and tuple forms of each code, and its printable string.
+        cls.__error_codes__ = dict([(val[0], (val, tuple(val))) for val in \
+                                    cls.__enum_values__])
+        cls.__error_strings__ = dict([(val[0], ', '.join([str(item) for \
+                                    item in val])) for val in \
+                                    cls.__enum_values__])
+
+
 class InstErrorCode(BaseEnum):
     """
     Error codes generated by instrument drivers and agents.
     """
+    __metaclass__ = _ErrorCodeMeta
+
     OK = ['OK']
     INVALID_DESTINATION = ['ERROR_INVALID_DESTINATION','Intended destination for a message or operation is not valid.']
     TIMEOUT = ['ERROR_TIMEOUT','The message or operation timed out.']
@@ -484,6 +565,20 @@ class InstErrorCode(BaseEnum):
     INVALID_STATUS = ['ERROR_INVALID_STATUS','The given argument is not a valid status key.']    
     
     
+    @classmethod
+    def has(cls,item):
+        """
+        Is the object an error code value. Error code values are lists, so
+        the value is looked up by code name rather than by scanning the enum
+        values.
+        @param item The value to test for.
+        @retval True if item is a list matching one of the error codes, False
+            otherwise.
+        """
+        return isinstance(item,list) and \
+            _error_code(cls.__error_codes__,item) is not None
+
+
     @classmethod
     def is_ok(cls,x):
         """
@@ -493,9 +588,9 @@ class InstErrorCode(BaseEnum):
         @retval True if x is a success value, False otherwise.
         """
         
-        x = cls.get_list_val(x)
-        
-        return x == cls.OK
+        # Replies usually carry the OK constant itself; only look up values
+        # the framework has copied or converted.
+        return x is cls.OK or _error_code(cls.__error_codes__,x) is cls.OK
     
     
     @classmethod
@@ -506,9 +601,12 @@ class InstErrorCode(BaseEnum):
         @retval True if x is an error value, False otherwise.
         """
         
-        x = cls.get_list_val(x)
+        if x is cls.OK:
+            return False
         
-        return (cls.has(x) and x != cls.OK)
+        x = _error_code(cls.__error_codes__,x)
+        
+        return (x is not None and x is not cls.OK)
     
     
     @classmethod
@@ -521,47 +619,109 @@ class InstErrorCode(BaseEnum):
         @retval True if val1 and val2 are equal and defined, False otherwise.
         """
 
-        val1 = cls.get_list_val(val1)
-        val2 = cls.get_list_val(val2)
+        codes = cls.__error_codes__
+        val1 = _error_code(codes,val1)
         
-        return cls.has(val1) and cls.has(val2) and (val1 == val2)
+        # val2 is usually one of the class's own codes, already what the
+        # lookup would return.
+        return (val1 is not None) and (val1 is val2 or
+                                       val1 is _error_code(codes,val2))
             
 
-    @classmethod
-    def get_list_val(cls,x):
+    @staticmethod
+    def get_list_val(x):
         """
         Convert error code values to lists. The messaging framework can
         convert lists to tuples. Allow for simple strings to be compared also.
         """
         
-        assert(isinstance(x,(str,tuple,list))), 'Expected a str, tuple or list \
-        error code value.'
-        
-        # Object is a list, return unmodified.
-        if isinstance(x,list):
-            return x
-        
-        # Object is a string, return length 1 list with string as the value.
-        elif isinstance(x,str):
-            return list((x,))
-        
-        # Object is a tuple, return a tuple with same elements.
-        else:
-            return list(x)            
+        return _list_val(x)
+
         
     @classmethod
     def get_string(cls,x):
         """
         Convert an error code to a printable string.
         """
-        x = cls.get_list_val(x)
-        if cls.has(x):
-            strval = ''
-            for item in x:
-                strval += str(item) + ', '
-            strval = strval[:-2]
-            return strval
+        x = _error_code(cls.__error_codes__,x)
+        if x is not None:
+            return cls.__error_strings__[x[0]]
 
         else:
             return None
-        
+
+
+def _error_code(codes,x):
+    """
+    Find the error code value matching a str, tuple or list, looking it up
+    by code name. Tuples are compared to a stored tuple copy of the code and
+    strings by length, so nothing is converted or allocated per call.
+    @param codes The error code table of an InstErrorCode class.
+    @param x A str, tuple or list error code value.
+    @retval The matching error code list value, None if x is not an error
+        code.
+    """
+    
+    t = _error_code_type(x)
+    
+    try:
+        if t is list:
+            (code, code_tuple) = codes[x[0]]
+            if code == x:
+                return code
+        elif t is str:
+            (code, code_tuple) = codes[x]
+            if len(code) == 1:
+                return code
+        else:
+            (code, code_tuple) = codes[x[0]]
+            if code_tuple == x:
+                return code
+    except (KeyError, IndexError, TypeError):
+        pass
+    
+    return None
+
+
+def _error_code_type(x):
+    """
+    Get the type an error code value is handled as. Checks the exact type
+    first, as error codes are almost always plain lists, tuples or strings,
+    and only then allows for subclasses.
+    @param x A str, tuple or list error code value.
+    @retval list, tuple or str.
+    @throws TypeError if x is not a str, tuple or list.
+    """
+    t = type(x)
+    if t is list or t is tuple or t is str:
+        return t
+    
+    if isinstance(x,list):
+        return list
+    elif isinstance(x,tuple):
+        return tuple
+    elif isinstance(x,str):
+        return str
+    
+    raise TypeError('Expected a str, tuple or list error code value.')
+
+def _list_val(x):
+    """
+    Convert an error code value to a list.
+    @param x A str, tuple or list error code value.
+    @retval The list value, x itself if x is already a list.
+    @throws TypeError if x is not a str, tuple or list.
+    """
+    t = _error_code_type(x)
+    
+    # Object is a list, return unmodified.
+    if t is list:
+        return x
+    
+    # Object is a string, return length 1 list with string as the value.
+    elif t is str:
+        return [x]
+    
+    # Object is a tuple, return a list with same elements.
+    else:
+        return list(x)
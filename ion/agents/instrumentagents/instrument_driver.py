@@ -8,16 +8,24 @@
 """
 
 
-from twisted.internet import defer, reactor
+from twisted.internet import defer, reactor, threads
 
 import ion.util.ionlog
 from ion.core.process.process import Process, ProcessClient
+from ion.agents.instrumentagents.instrument_constants import InstErrorCode
 
 
 
 log = ion.util.ionlog.getLogger(__name__)
 
 
+"""
+Sequence types accepted for channel, command and parameter lists. Bound once
+rather than building the tuple on every type check.
+"""
+list_types = (list, tuple)
+
+
 class InstrumentDriver(Process):
     """
     Instrument driver base class for instrument specific driver subclasses.
@@ -153,6 +161,15 @@ class InstrumentDriver(Process):
             device_state_list for the common states.)
          """
 
+    def _blocking_call(self, func, *args, **kwargs):
+        """
+        Run blocking device I/O in the reactor thread pool so the driver
+        keeps dispatching messages while the call completes. func must not
+        touch the reactor.
+        @retval A deferred firing with the return value of func.
+        """
+        return threads.deferToThread(func, *args, **kwargs)
+
 
 class InstrumentDriverClient(ProcessClient):
     """
@@ -176,8 +193,8 @@ class InstrumentDriverClient(ProcessClient):
             chan_arg:(success,command_specific_values)}}. 
         """
 
-        assert(isinstance(channels, (list,tuple))),'Expected list or tuple channels.'
-        assert(isinstance(command, (list,tuple))), 'Expected list or tuple command.'
+        assert(isinstance(channels, list_types)),'Expected list or tuple channels.'
+        assert(isinstance(command, list_types)), 'Expected list or tuple command.'
         if timeout != None:
             assert(isinstance(timeout, int)), 'Expected a timeout int.'
             assert(timeout>0), 'Expected a positive timeout.'
@@ -209,7 +226,7 @@ class InstrumentDriverClient(ProcessClient):
                 ,(chan_arg,param_arg):(success,val)}}        
         """
                 
-        assert(isinstance(params, (list, tuple))), 'Expected a params list or tuple.'                
+        assert(isinstance(params, list_types)), 'Expected a params list or tuple.'                
         if timeout != None:
             assert(isinstance(timeout, int)), 'Expected a timeout int.'
             assert(timeout>0), 'Expected a positive timeout.'
@@ -259,6 +276,27 @@ class InstrumentDriverClient(ProcessClient):
         defer.returnValue(content)
 
 
+    @defer.inlineCallbacks
+    def set_verify(self, params, timeout=None):
+        """
+        Set parameters to the device and read them back.
+        @param params A dict {(chan_arg,param_arg):val,...,
+            (chan_arg,param_arg):val}.
+        @param timeout optional timeout to the driver causes the rpc timeout
+            to be set slightly longer.
+        @retval The get reply for the parameters set, a dict
+            {'success':success,'result':{(chan_arg,param_arg):(success,val),...
+                ,(chan_arg,param_arg):(success,val)}}, or the set reply if
+            the set failed.
+        """
+        reply = yield self.set(params, timeout)
+        if InstErrorCode.is_error(reply.get('success', None)):
+            defer.returnValue(reply)
+
+        reply = yield self.get(params.keys(), timeout)
+        defer.returnValue(reply)
+
+
     @defer.inlineCallbacks
     def execute_direct(self, bytes, timeout=None):
         """
@@ -301,7 +339,7 @@ class InstrumentDriverClient(ProcessClient):
                 chan_arg,param_arg,meta_arg):(success,val)}}.        
         """
         
-        assert(isinstance(params, (list, tuple))), 'Expected a params list or tuple.'        
+        assert(isinstance(params, list_types)), 'Expected a params list or tuple.'        
         if timeout != None:
             assert(isinstance(timeout, int)), 'Expected a timeout int.'
             assert(timeout>0), 'Expected a positive timeout.'
@@ -333,7 +371,7 @@ class InstrumentDriverClient(ProcessClient):
                 ...,chan_arg,status_arg):(success,val)}}.
         """
         
-        assert(isinstance(params, (list, tuple))), 'Expected a params list or tuple.'        
+        assert(isinstance(params, list_types)), 'Expected a params list or tuple.'        
         if timeout != None:
             assert(isinstance(timeout, int)), 'Expected a timeout int.'
             assert(timeout>0), 'Expected a positive timeout.'
@@ -365,7 +403,7 @@ class InstrumentDriverClient(ProcessClient):
                 ...,cap_arg:(success,val)}}.
        """
 
-        assert(isinstance(params, (list, tuple))), 'Expected a params list or tuple.'        
+        assert(isinstance(params, list_types)), 'Expected a params list or tuple.'        
         if timeout != None:
             assert(isinstance(timeout, int)), 'Expected a timeout int.'
             assert(timeout>0), 'Expected a positive timeout.'
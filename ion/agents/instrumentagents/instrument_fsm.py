@@ -13,11 +13,15 @@ log = ion.util.ionlog.getLogger(__name__)
 
 
 
-class InstrumentFSM():
+class InstrumentFSM(object):
     """
     Simple state mahcine for driver and agent classes.
     """
 
+    __slots__ = ('states','events','state_handlers','current_state',
+                 'previous_state','enter_event','exit_event',
+                 '_current_handler','_state_set')
+
 
     def __init__(self, states, events, state_handlers,enter_event,exit_event):
         """
@@ -25,9 +29,11 @@ class InstrumentFSM():
         """
         self.states = states
         self.events = events
+        self._state_set = frozenset(states.values())
         self.state_handlers = state_handlers
         self.current_state = None
         self.previous_state = None
+        self._current_handler = None
         self.enter_event = enter_event
         self.exit_event = exit_event
 
@@ -47,52 +53,70 @@ class InstrumentFSM():
         #if state not in self.states:
         #    return False
         
-        if not self.states.has(state):
+        if state not in self._state_set:
             return False
         
         self.current_state = state
-        self.state_handlers[self.current_state](self.enter_event,params)
+        self._current_handler = self.state_handlers[state]
+        self._current_handler(self.enter_event,params)
         return True
 
     def on_event(self,event,params=None):
         """
         Handle an event. Call the current state handler passing the event
-        and paramters.
+        and paramters. The handler returns (success,next_state,result), with
+        next_state None if the FSM stays in the current state.
         @param event A string indicating the event that has occurred.
         @param params Optional parameters to be sent with the event to the
             handler.
         @retval Success/fail if the event was handled by the current state.
         """
         
-        (success,next_state,result) = self.state_handlers[self.current_state](event,params)
+        (success,next_state,result) = self._current_handler(event,params)
         
         
-        #if next_state in self.states:
-        if self.states.has(next_state):
+        if next_state is not None:
+            assert next_state in self._state_set, \
+                'Unknown next state %s' % str(next_state)
             self._on_transition(next_state,params)
                 
         return (success,result)
 
-    @defer.inlineCallbacks
     def on_event_async(self,event,params=None):
         """
         Handle an event. Call the current state handler passing the event
-        and paramters.
+        and paramters. The handler returns (success,next_state,result), with
+        next_state None if the FSM stays in the current state. The handler
+        may return the tuple directly or a deferred firing with it, the
+        transition is chained on without a generator either way.
         @param event A string indicating the event that has occurred.
         @param params Optional parameters to be sent with the event to the
             handler.
-        @retval Success/fail if the event was handled by the current state.
+        @retval Deferred firing with success/fail if the event was handled
+            by the current state.
         """
         log.debug("Instrument FSM handling async event %s with current state %s", event, self.current_state)
-        (success,next_state,result) = yield self.state_handlers[self.current_state](event,params)
+        d = defer.maybeDeferred(self._current_handler,event,params)
+        d.addCallback(self._after_handler,params)
+        return d
+
+
+    def _after_handler(self,handler_result,params):
+        """
+        Finish an async event once the state handler has returned, making
+        the transition if it asked for one.
+        """
+        (success,next_state,result) = handler_result
+        if next_state is not None:
+            assert next_state in self._state_set, \
+                'Unknown next state %s' % str(next_state)
+            d = self._on_transition_async(next_state,params)
+            d.addCallback(lambda _: (success,result))
+            return d
         
-        #if next_state in self.states:
-        if self.states.has(next_state):
-            yield self._on_transition_async(next_state,params)
-                
-        defer.returnValue((success,result))
+        return (success,result)
+
 
-            
     def _on_transition(self,next_state,params):
         """
         Call the sequence of events to cause a state transition. Called from
@@ -101,23 +125,34 @@ class InstrumentFSM():
         @param params Opional parameters passed from on_event
         """
         
-        self.state_handlers[self.current_state](self.exit_event,params)
+        self._current_handler(self.exit_event,params)
         self.previous_state = self.current_state
         self.current_state = next_state
-        self.state_handlers[self.current_state](self.enter_event,params) 
+        self._current_handler = self.state_handlers[next_state]
+        self._current_handler(self.enter_event,params)
 
 
-    @defer.inlineCallbacks
     def _on_transition_async(self,next_state,params):
         """
         Call the sequence of events to cause a state transition. Called from
         on_event if the handler causes a transition.
         @param next_state The state to transition to.
         @param params Opional parameters passed from on_event
+        @retval Deferred firing once the new state has been entered.
         """
         
-        yield self.state_handlers[self.current_state](self.exit_event,params)
+        d = defer.maybeDeferred(self._current_handler,self.exit_event,params)
+        d.addCallback(self._enter_state,next_state,params)
+        return d
+
+
+    def _enter_state(self,_,next_state,params):
+        """
+        Make next_state current and call its handler with the enter event,
+        once the old state has handled the exit event.
+        """
         self.previous_state = self.current_state
         self.current_state = next_state
+        self._current_handler = self.state_handlers[next_state]
         log.debug("Instrument Driver FSM transitioning from %s to %s", self.previous_state, self.current_state)
-        yield self.state_handlers[self.current_state](self.enter_event,params)        
+        return self._current_handler(self.enter_event,params)
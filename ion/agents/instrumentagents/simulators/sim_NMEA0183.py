@@ -6,7 +6,8 @@
 """
 import os
 import signal
-from twisted.internet import defer
+from operator import xor
+from twisted.internet import defer, threads
 from datetime import datetime
 import subprocess
 import tempfile
@@ -18,6 +19,7 @@ log = ion.util.ionlog.getLogger(__name__)
 tmpDir = tempfile.gettempdir()
 SERPORTMASTER = tmpDir +  '/serPortMaster'
 SERPORTSLAVE = tmpDir + '/serPortSlave'
+SERPORTWAITSTEPS = 20
 SOCATapp = 'socat'
 SERPORTMODE = 'w+'
 NULLPORTMODE = 'w'
@@ -70,20 +72,11 @@ def CalcMagVar(lat, lon):
     return '001.2', 'E'
 
 def CalcChecksum(str):
-    if len(str) < 1:
-        return '00'
     # Calculate checksum
     # checksum = 8-bit XOR of all chars in string
     # checksum is an 8-bit number(0 to 255)
     # result is a hex byte version of the checksum
-    cs = ord(reduce(lambda x, y: chr(ord(x) ^ ord(y)), str))
-    calcHigh = 48 +((cs & 240) >> 4)  # CS and 11110000
-    calcLow = 48 +(cs & 15)           # CS and 00001111
-    if calcHigh > 57:
-        calcHigh += 7
-    if calcLow > 57:
-        calcLow += 7
-    return chr(calcHigh) + chr(calcLow)
+    return '%02X' % reduce(xor, bytearray(str), 0)
 
 def BuildPGRMC():
     """
@@ -549,15 +542,31 @@ class NMEA0183SimBase:
         # Create the virtual serial ports
         master = 'pty,link=' + SERPORTMASTER + ',raw,echo=0'
         slave = 'pty,link=' + SERPORTSLAVE + ',raw,echo=0'
+
+        # Clear links left by an earlier socat so the wait below only sees
+        # the new ones.
+        for link in (SERPORTMASTER, SERPORTSLAVE):
+            if os.path.lexists(link):
+                os.remove(link)
+
+        # Launch socat from a thread so the fork and exec do not hold up
+        # the reactor.
         try:
             log.info('Creating virtual serial port. Running %s...' % SOCATapp)
-            self._vsp = subprocess.Popen([SOCATapp, master, slave],
+            self._vsp = yield threads.deferToThread(subprocess.Popen,
+                                         [SOCATapp, master, slave],
                                          stdout = nullDesc.fileno(),
                                          stderr = nullDesc.fileno())
         except OSError, e:
             log.error('Failure:  Could not create virtual serial port(s): %s' % e)
             return
-        yield pu.asleep(1) # wait just a bit for connect
+
+        # Wait for socat to create the port links, polling for up to a
+        # second rather than always sleeping the full second.
+        for i in xrange(SERPORTWAITSTEPS):
+            if os.path.exists(SERPORTMASTER) and os.path.exists(SERPORTSLAVE):
+                break
+            yield pu.asleep(1.0 / SERPORTWAITSTEPS)
         if not os.path.exists(SERPORTMASTER) and os.path.exists(SERPORTSLAVE):
             log.error('Failure:  Unknown reason.')
             return
@@ -52,7 +52,7 @@ class NMEASimProtocol(basic.LineReceiver):
         inNMEA = NMEA.NMEAInString(line)
         inData = inNMEA.GetNMEAInData()
         if type(inData) == type({}):
-            if inData.has_key('NMEA_CD'):
+            if 'NMEA_CD' in inData:
                 if inData['NMEA_CD'] == 'PGRMO':
                     self.SetSentenceStatus(inData)
                 elif inData['NMEA_CD'] == 'PGRMC':
@@ -65,44 +65,44 @@ class NMEASimProtocol(basic.LineReceiver):
         """
         """
         log.debug(d)
-        if d.has_key('FIX_MODE') and len(d['FIX_MODE']) > 0:
+        if 'FIX_MODE' in d and len(d['FIX_MODE']) > 0:
             if 'A23'.find(d['FIX_MODE'][0]) > -1:
                 sim_NMEA0183.NMEA0183SimBase.cfg_FIXMODE = d['FIX_MODE'][0]
 
-        if d.has_key('ALT_MSL') and len(d['ALT_MSL']) > 0:
+        if 'ALT_MSL' in d and len(d['ALT_MSL']) > 0:
             dVal = float(d['ALT_MSL'])
             if dVal >= -1500.0 and dVal <= 18000.0:
                 sim_NMEA0183.NMEA0183SimBase.cfg_ALT = dVal
 
-        if d.has_key('E_DATUM') and len(d['E_DATUM']) > 0:
+        if 'E_DATUM' in d and len(d['E_DATUM']) > 0:
             iVal = int(d['E_DATUM'])
             if iVal > -1 and iVal < 110:
                 sim_NMEA0183.NMEA0183SimBase.cfg_DATUMINDEX = iVal
 
-        if d.has_key('DIFFMODE') and len(d['DIFFMODE']) > 0:
+        if 'DIFFMODE' in d and len(d['DIFFMODE']) > 0:
             if d['DIFFMODE'][0] == 'A' or d['DIFFMODE'][0] == 'D':
                 sim_NMEA0183.NMEA0183SimBase.cfg_DIFFMODE = d['DIFFMODE'][0]
 
-        if d.has_key('BAUD_RT') and len(d['BAUD_RT']) > 0:
+        if 'BAUD_RT' in d and len(d['BAUD_RT']) > 0:
             iVal = int(d['BAUD_RT'])
             if iVal > 0 and iVal < 9:
                 sim_NMEA0183.NMEA0183SimBase.cfg_BAUD = iVal
 
-        if d.has_key('VEL_FILT') and len(d['VEL_FILT']) > 0:
+        if 'VEL_FILT' in d and len(d['VEL_FILT']) > 0:
             iVal = int(d['VEL_FILT'])
             if iVal > -1 and iVal < 256:
                 sim_NMEA0183.NMEA0183SimBase.cfg_VELFILTER = iVal
 
-        if d.has_key('MP_OUT') and len(d['MP_OUT']) > 0:
+        if 'MP_OUT' in d and len(d['MP_OUT']) > 0:
             if d['MP_OUT'][0] == '1' or d['MP_OUT'][0] == '2':
                 sim_NMEA0183.NMEA0183SimBase.cfg_MPO = d['MP_OUT'][0]
 
-        if d.has_key('MP_LEN') and len(d['MP_LEN']) > 0:
+        if 'MP_LEN' in d and len(d['MP_LEN']) > 0:
             iVal = int(d['MP_LEN'])
             if iVal > -1 and iVal < 49:
                 sim_NMEA0183.NMEA0183SimBase.cfg_MPOLEN = iVal
 
-        if d.has_key('DED_REC') and len(d['DED_REC']) > 0:
+        if 'DED_REC' in d and len(d['DED_REC']) > 0:
             iVal = int(d['DED_REC'])
             if iVal > 0 and iVal < 31:
                 sim_NMEA0183.NMEA0183SimBase.cfg_DEDRECKON = iVal
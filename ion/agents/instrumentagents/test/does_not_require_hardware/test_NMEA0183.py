@@ -5,6 +5,7 @@
 @author Alon Yaari
 """
 
+from twisted.trial import unittest
 from twisted.internet import defer
 import ion.util.ionlog
 import ion.agents.instrumentagents.helper_NMEA0183 as NMEA
@@ -32,6 +33,76 @@ from ion.agents.instrumentagents.simulators.sim_NMEA0183_preplanned \
     import NMEA0183SimPrePlanned as sim
 log.info ('Using PREPLANNED ROUTE GPS Simulator')
 
+
+class TestNMEA0183Parser(unittest.TestCase):
+    """
+    NMEA string parsing, which needs no simulator, container or driver.
+    """
+
+    def test_NMEAParser (self):
+        """
+        Verify NMEA parsing routines.
+        """
+        # Verify parsing of known VALID GPGGA string
+        testNMEA = '$GPGGA,051950.00,3532.2080,N,12348.0348,W,1,09,07.9,0005.9,M,0042.9,M,0.0,0000*52'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify parsing of known INVALID GPGGA string (has bad checksum)
+        testNMEA = '$GPGGA,051950.00,3532.2080,N,12348.0348,W,1,09,07.9,0005.9,M,0042.9,M,0.0,0000*F2'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify parsing of known VALID dummy string
+        testNMEA = '$XXXXX,0'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify line endings: <LF>, <CR>, <CR><LF>, and <LF><CR>
+        testNMEA = '$XXXXX,0\r'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+        testNMEA = '$XXXXX,0\n'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+        testNMEA = '$XXXXX,0\r\n'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+        testNMEA = '$XXXXX,0\n\r'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify parsing of known VALID GPRMC string with checksum
+        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E*68'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify parsing of known VALID GPRMC string without checksum
+        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify parsing of known INVVALID GPRMC (not enough fields)
+        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify reporting of status (PGRMC command)
+        testNMEA = '$PGRMC'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (parseNMEA.IsValid())
+
+        # Verify repeated GetNMEAData calls return the parsed data
+        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E*68'
+        parseNMEA = NMEA.NMEAString (testNMEA)
+        self.assertTrue (NMEA.NMEAErrorCode.is_ok (parseNMEA.IsValid()))
+        firstData = parseNMEA.GetNMEAData()
+        self.assertEqual (firstData['NMEA_CD'], 'GPRMC')
+        self.assertEqual (parseNMEA.GetNMEAData(), firstData)
+
+        log.debug ('test_NMEAParser complete')
+
+
 """
 Simulator dependencies required:
     LIVESFBAY:
@@ -84,9 +155,10 @@ class TestNMEADevice(IonTestCase):
         """
         Prepare container and simulator for testing
         """
-        yield self._start_container()
         self._sim = sim()
-        yield self._sim.SetupSimulator()
+        yield defer.DeferredList([self._start_container(),
+                                  self._sim.SetupSimulator()],
+                                 fireOnOneErrback=True, consumeErrors=True)
         self.assertTrue (self._sim.IsSimulatorRunning())
 
         services = [{'name': 'driver_NMEA0183',
@@ -107,61 +179,6 @@ class TestNMEADevice(IonTestCase):
         self.assertFalse(self._sim.IsSimulatorRunning())
         yield self._stop_container()
 
-    def test_NMEAParser (self):
-        """
-        Verify NMEA parsing routines.
-        """
-        # Verify parsing of known VALID GPGGA string
-        testNMEA = '$GPGGA,051950.00,3532.2080,N,12348.0348,W,1,09,07.9,0005.9,M,0042.9,M,0.0,0000*52'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known INVALID GPGGA string (has bad checksum)
-        testNMEA = '$GPGGA,051950.00,3532.2080,N,12348.0348,W,1,09,07.9,0005.9,M,0042.9,M,0.0,0000*F2'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known VALID dummy string
-        testNMEA = '$XXXXX,0'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify line endings: <LF>, <CR>, <CR><LF>, and <LF><CR>
-        testNMEA = '$XXXXX,0\r'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-        testNMEA = '$XXXXX,0\n'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-        testNMEA = '$XXXXX,0\r\n'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-        testNMEA = '$XXXXX,0\n\r'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known VALID GPRMC string with checksum
-        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E*68'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known VALID GPRMC string without checksum
-        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known INVVALID GPRMC (not enough fields)
-        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify reporting of status (PGRMC command)
-        testNMEA = '$PGRMC'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        log.debug ('test_NMEAParser complete')
-
     @defer.inlineCallbacks
     def test_configure (self):
         """
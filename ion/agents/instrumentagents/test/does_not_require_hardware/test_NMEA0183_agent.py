@@ -7,13 +7,12 @@
 @author Alon Yaari
 """
 
-from twisted.internet import defer
+from twisted.internet import defer, reactor
 from ion.test.iontest import IonTestCase
 
 import ion.util.ionlog
 import ion.util.procutils as pu
 
-import ion.agents.instrumentagents.instrument_agent as instrument_agent
 from ion.agents.instrumentagents.instrument_constants import AgentCommand
 from ion.agents.instrumentagents.instrument_constants import AgentParameter
 from ion.agents.instrumentagents.instrument_constants import AgentEvent
@@ -29,10 +28,7 @@ from ion.agents.instrumentagents.driver_NMEA0183 import NMEADeviceCommand
 from ion.agents.instrumentagents.driver_NMEA0183 import NMEADeviceParam
 from ion.agents.instrumentagents.driver_NMEA0183 import NMEADeviceMetadataParameter
 from ion.agents.instrumentagents.driver_NMEA0183 import NMEADeviceStatus
-import ion.agents.instrumentagents.helper_NMEA0183 as NMEA
-from ion.core.process.process import Process
-
-from ion.services.dm.distribution.events import DataBlockEventSubscriber
+from ion.agents.instrumentagents.driver_NMEA0183 import CfgNMEADevice
 
 from ion.agents.instrumentagents.simulators.sim_NMEA0183_preplanned \
     import NMEA0183SimPrePlanned as sim
@@ -41,6 +37,46 @@ from ion.agents.instrumentagents.simulators.sim_NMEA0183 \
 
 log = ion.util.ionlog.getLogger(__name__)
 
+"""
+Expected capability values, as sets since the agent and driver do not
+guarantee an order. The driver reports its configurable parameter names as
+the device parameters.
+"""
+capability_values = {
+    InstrumentCapability.DEVICE_CHANNELS:   frozenset(NMEADeviceChannel.values()),
+    InstrumentCapability.DEVICE_COMMANDS:   frozenset(NMEADeviceCommand.values()),
+    InstrumentCapability.DEVICE_METADATA:   frozenset(NMEADeviceMetadataParameter.values()),
+    InstrumentCapability.DEVICE_PARAMS:     frozenset(CfgNMEADevice.defParams),
+    InstrumentCapability.DEVICE_STATUSES:   frozenset(NMEADeviceStatus.values()),
+    InstrumentCapability.OBSERVATORY_COMMANDS: frozenset(AgentCommand.values()),
+    InstrumentCapability.OBSERVATORY_METADATA: frozenset(MetadataParameter.values()),
+    InstrumentCapability.OBSERVATORY_PARAMS: frozenset(AgentParameter.values()),
+    InstrumentCapability.OBSERVATORY_STATUSES: frozenset(AgentStatus.values())
+}
+
+"""
+Status query for the agent state, shared by the state checks. The client
+sends a copy, so the list is never changed.
+"""
+agent_state_params = [AgentStatus.AGENT_STATE]
+
+"""
+Agent events run by test_state_transitions, each with the state the agent
+should be in afterwards.
+"""
+state_transitions = [
+    # Initialize the agent to bring up the driver and client.
+    (AgentEvent.INITIALIZE,     AgentState.INACTIVE),
+    # Connect to the driver.
+    (AgentEvent.GO_ACTIVE,      AgentState.IDLE),
+    # Enter observatory mode.
+    (AgentEvent.RUN,            AgentState.OBSERVATORY_MODE),
+    # Disconnect from the driver.
+    #(AgentEvent.GO_INACTIVE,   AgentState.INACTIVE),
+    # Reset the agent to disconnect and bring down the driver and client.
+    (AgentEvent.RESET,          AgentState.UNINITIALIZED)
+]
+
 """
     These tests requires that a simulator (or real NMEA GPS device!) is attached to:
             /dev/slave
@@ -57,14 +93,16 @@ class TestNMEA0183Agent (IonTestCase):
 
         log.info("TestNMEA0183Agent.setUp")
         
+        # The simulator and container do not depend on each other, so bring
+        # them up together.
         self._sim = sim()
-        yield self._sim.SetupSimulator()
+        yield defer.DeferredList([self._sim.SetupSimulator(),
+                                  self._start_container()],
+                                 fireOnOneErrback=True, consumeErrors=True)
 
         if self._sim.IsSimOK():
             log.info ('----- Simulator launched.')
         self.assertEqual (self._sim.IsSimulatorRunning(), 1)
-        
-        yield self._start_container()
 
         # Driver and agent configuration. Configuration data will ultimately be accessed via
         # some persistence mechanism: platform filesystem or a device registry.
@@ -115,7 +153,9 @@ class TestNMEA0183Agent (IonTestCase):
         # Processes for the tests.
         processes           = [ agent_desc ]
         
-        # Spawn agent and driver, create agent client.
+        # Spawn agent and driver, create agent client. The agent is imported
+        # here so that collecting these tests does not load it.
+        import ion.agents.instrumentagents.instrument_agent as instrument_agent
         self.sup            = yield self._spawn_processes (processes)
         self.svc_id         = yield self.sup.get_child_id ('instrument_agent')
         self.ia_client      = instrument_agent.InstrumentAgentClient (proc = self.sup, target = self.svc_id)
@@ -130,115 +170,64 @@ class TestNMEA0183Agent (IonTestCase):
 
 
     @defer.inlineCallbacks
-    def test_state_transitions (self):
+    def _assert_agent_state (self, state, tid='none'):
         """
-        Test cases for executing device commands through the instrument agent.
+        Check the agent state.
         """
-        # Check agent state upon creation. No transaction needed for get operation.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
+        reply = yield self.ia_client.get_observatory_status (
+            agent_state_params, tid)
+        (success, result) = (reply['success'], reply['result'])
         self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        self.assertEqual(result[AgentStatus.AGENT_STATE][1], state)
 
-        # Check that the driver and client descriptions were set by spawnargs, and save them for later restore.
 
-        # Begin an explicit transaciton.
-        reply = yield self.ia_client.start_transaction()
-        success = reply['success']
-        tid = reply['transaction_id']
+    @defer.inlineCallbacks
+    def _start_transaction (self, *args):
+        """
+        Begin an explicit transaction and check its ID.
+        @retval A deferred firing with the transaction ID.
+        """
+        reply = yield self.ia_client.start_transaction (*args)
+        (success, tid) = (reply['success'], reply['transaction_id'])
         self.assert_(InstErrorCode.is_ok (success))
         self.assertEqual(type (tid), str)
         self.assertEqual(len (tid), 36)
+        defer.returnValue(tid)
 
-        # Initialize with a bad client desc. value.
-        # This should fail and leave us in the uninitialized state with null driver and client.
 
-        # Restore the good process and client desc. values.
-
-        # Initialize the agent to bring up the driver and client.
-        cmd = [AgentCommand.TRANSITION, AgentEvent.INITIALIZE]
+    @defer.inlineCallbacks
+    def _assert_transition (self, tid, event, state):
+        """
+        Execute an agent transition and check the agent state returned in
+        the reply, saving a separate get_observatory_status round trip.
+        """
+        cmd = [AgentCommand.TRANSITION, event]
         reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok (success))
+        self.assert_(InstErrorCode.is_ok (reply['success']))
+        self.assertEqual(reply['result'], state)
 
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params, tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.INACTIVE)
-
-        # Connect to the driver.
-        cmd = [AgentCommand.TRANSITION,AgentEvent.GO_ACTIVE]
-        reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok (success))
 
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params, tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.IDLE)
-        
-        # Enter observatory mode.
-        cmd = [AgentCommand.TRANSITION, AgentEvent.RUN]
-        reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok (success))
-    
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params, tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.OBSERVATORY_MODE)
-        
+    @defer.inlineCallbacks
+    def test_state_transitions (self):
         """
-        # Discnnect from the driver.
-        cmd = [AgentCommand.TRANSITION,AgentEvent.GO_INACTIVE]
-        reply = yield self.ia_client.execute_observatory(cmd,tid) 
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok(success))
-        
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.INACTIVE)
+        Test cases for executing device commands through the instrument agent.
         """
-        
-        # Reset the agent to disconnect and bring down the driver and client.
-        cmd = [AgentCommand.TRANSITION, AgentEvent.RESET]
-        reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok (success))
+        # Check agent state upon creation. No transaction needed for get operation.
+        yield self._assert_agent_state(AgentState.UNINITIALIZED)
 
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params, tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        # Check that the driver and client descriptions were set by spawnargs, and save them for later restore.
+
+        # Begin an explicit transaciton.
+        tid = yield self._start_transaction()
+
+        # Initialize with a bad client desc. value.
+        # This should fail and leave us in the uninitialized state with null driver and client.
+
+        # Restore the good process and client desc. values.
+
+        # Step the agent through its states and back to uninitialized.
+        for (event, state) in state_transitions:
+            yield self._assert_transition(tid, event, state)
 
         # End the transaction.
         reply = yield self.ia_client.end_transaction (tid)
@@ -254,84 +243,24 @@ class TestNMEA0183Agent (IonTestCase):
         log.info("TestNMEA0183Agent.test_execute_instrument\n")
 
         # Check agent state upon creation. No transaction needed for get operation.
-        log.debug('+++++ Check agent state upon creation.')
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        yield self._assert_agent_state(AgentState.UNINITIALIZED)
 
         # Begin an explicit transaciton.
-        log.debug('+++++ Begin an explicit transaciton.')
-        reply = yield self.ia_client.start_transaction(0)
-        success = reply['success']
-        tid = reply['transaction_id']
-        self.assert_(InstErrorCode.is_ok(success))
-        self.assertEqual(type(tid),str)
-        self.assertEqual(len(tid),36)
+        tid = yield self._start_transaction(0)
         
         # Initialize the agent to bring up the driver and client.
-        log.debug('+++++ Initialize the agent to bring up the driver and client.')
-        cmd = [AgentCommand.TRANSITION,AgentEvent.INITIALIZE]
-        reply = yield self.ia_client.execute_observatory(cmd,tid) 
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok(success))
-
-        # Check agent state.
-        log.debug('+++++ Check agent state.')
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.INACTIVE)
+        yield self._assert_transition(tid, AgentEvent.INITIALIZE, AgentState.INACTIVE)
 
         # Connect to the driver.
-        log.debug('+++++ Connect to the driver.')
-        cmd = [AgentCommand.TRANSITION,AgentEvent.GO_ACTIVE]
-        reply = yield self.ia_client.execute_observatory(cmd,tid) 
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok(success))
-
-        # Check agent state.
-        log.debug('+++++ Check agent state.')
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.IDLE)
+        yield self._assert_transition(tid, AgentEvent.GO_ACTIVE, AgentState.IDLE)
         
         # Enter observatory mode.
-        log.debug('+++++ Enter observatory mode.')
-        cmd = [AgentCommand.TRANSITION,AgentEvent.RUN]
-        reply = yield self.ia_client.execute_observatory(cmd,tid) 
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok(success))        
-    
-        # Check agent state.
-        log.debug('+++++ Check agent state.')
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.OBSERVATORY_MODE)
+        yield self._assert_transition(tid, AgentEvent.RUN, AgentState.OBSERVATORY_MODE)
         
         # Get driver parameters.
-        log.debug('+++++ Get driver parameters.')
         params = [(DriverChannel.ALL,DriverParameter.ALL)]
         reply = yield self.ia_client.get_device(params,tid)
-        success = reply['success']
-        result = reply['result']
+        (success, result) = (reply['success'], reply['result'])
 
         # Strip off individual success vals to create a set params to
         # restore original config later.
@@ -341,7 +270,6 @@ class TestNMEA0183Agent (IonTestCase):
 
         # Set a few parameters. This will test the device set functions
         # and set up the driver for sampling commands.
-        log.debug('+++++ Set a few parameters.')
         chan = DriverChannel.GPS
         params = {}
         params[(chan, 'GPGGA')] = ON
@@ -351,19 +279,10 @@ class TestNMEA0183Agent (IonTestCase):
         params[(chan, 'ALT_MSL')] = 7.7
         params[(chan, 'DED_REC')] = 11
         
-        reply = yield self.ia_client.set_device(params,tid)
-        success = reply['success']
-        result = reply['result']
+        # Verify the set changes were made from the values read back.
+        reply = yield self.ia_client.set_device(params,tid,verify=True)
+        (success, result) = (reply['success'], reply['result'])
         setparams = params
-        self.assert_(InstErrorCode.is_ok(success))
-
-        # Verify the set changes were made.
-        log.debug('+++++ Verify the set changes were made.')
-        params = [(DriverChannel.ALL,DriverParameter.ALL)]
-        reply = yield self.ia_client.get_device(params, tid)
-        success = reply['success']
-        result = reply['result']
-
         self.assert_(InstErrorCode.is_ok(success))
         self.assertEqual(setparams[(chan, 'GPGGA')], result[(chan, 'GPGGA')][1])
         self.assertEqual(setparams[(chan, 'GPGLL')], result[(chan, 'GPGLL')][1])
@@ -374,33 +293,27 @@ class TestNMEA0183Agent (IonTestCase):
         
         
         # Reset the agent to disconnect and bring down the driver and client.
-        log.debug('+++++ Disconnect from serial port')
         cmd = [AgentCommand.TRANSITION, AgentEvent.RESET]
         reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
+        (success, result) = (reply['success'], reply['result'])
         self.assert_(InstErrorCode.is_ok (success))
         """ TODO Needs more work!
         
         # Acquire sample.
-        log.debug('+++++ Acquire sample.')
         chans = [DriverChannel.GPS]
         cmd = [DriverCommand.ACQUIRE_SAMPLE]
         reply = yield self.ia_client.execute_device(chans,cmd,tid)
-        success = reply['success']
-        result = reply['result']
+        (success, result) = (reply['success'], reply['result'])
         self.assert_(InstErrorCode.is_ok(success))
         self.assertIsInstance(result[0].get('GPS_LAT', None), float)
         self.assertIsInstance(result[0].get('GPS_LON', None), float)
         self.assertIsInstance(result[0].get('NMEA_CD', None), str)
         
         # Start autosampling.
-        log.debug('+++++ Start autosampling.')
         chans = [DriverChannel.GPS]
         cmd = [DriverCommand.START_AUTO_SAMPLING]
         reply = yield self.ia_client.execute_device(chans,cmd,tid)
-        success = reply['success']
-        result = reply['result']
+        (success, result) = (reply['success'], reply['result'])
         
         self.assert_(InstErrorCode.is_ok(success))
         
@@ -409,13 +322,11 @@ class TestNMEA0183Agent (IonTestCase):
         #yield pu.asleep(3)
         
         # Stop autosampling.
-        log.debug('+++++ Stop autosampling.')
         chans = [DriverChannel.GPS]
         cmd = [DriverCommand.STOP_AUTO_SAMPLING,'GETDATA']
         while True:
             reply = yield self.ia_client.execute_device(chans,cmd,tid)
-            success = reply['success']
-            result = reply['result']
+            (success, result) = (reply['success'], reply['result'])
             
             if InstErrorCode.is_ok(success):
                 break
@@ -427,79 +338,14 @@ class TestNMEA0183Agent (IonTestCase):
                 self.fail('Stop autosample failed with error: '+str(success))
         
         self.assert_(InstErrorCode.is_ok(success))
-        log.debug('+++++ type: %s  %s' % (type(result), result))
+        log.debug('+++++ type: %s  %s', type(result), result)
         
         # Restore original configuration.
-        log.debug('+++++ Restore original configuration.')
         reply = yield self.ia_client.set_device(orig_config,tid)
-        success = reply['success']
-        result = reply['result']
+        (success, result) = (reply['success'], reply['result'])
         self.assert_(InstErrorCode.is_ok(success))
         """
 
-    def test_NMEAParser (self):
-        """
-        Verify NMEA parsing routines.
-        """
-        # Verify parsing of known VALID GPGGA string
-        log.debug('+++++ Verify parsing of known VALID GPGGA string')
-        testNMEA = '$GPGGA,051950.00,3532.2080,N,12348.0348,W,1,09,07.9,0005.9,M,0042.9,M,0.0,0000*52'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known INVALID GPGGA string (has bad checksum)
-        log.debug('+++++ Verify parsing of known INVALID GPGGA string (has bad checksum)')
-        testNMEA = '$GPGGA,051950.00,3532.2080,N,12348.0348,W,1,09,07.9,0005.9,M,0042.9,M,0.0,0000*F2'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known VALID dummy string
-        log.debug('+++++ Verify parsing of known VALID dummy string')
-        testNMEA = '$XXXXX,0'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify line endings: <LF>, <CR>, <CR><LF>, and <LF><CR>
-        log.debug('+++++ Verify line endings: <LF>, <CR>, <CR><LF>, and <LF><CR>')
-        testNMEA = '$XXXXX,0\r'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-        testNMEA = '$XXXXX,0\n'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-        testNMEA = '$XXXXX,0\r\n'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-        testNMEA = '$XXXXX,0\n\r'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known VALID GPRMC string with checksum
-        log.debug('+++++ Verify parsing of known VALID GPRMC string with checksum')
-        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E*68'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known VALID GPRMC string without checksum
-        log.debug('+++++ Verify parsing of known VALID GPRMC string without checksum')
-        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5,054.7,191194,020.3,E'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify parsing of known INVALID GPRMC (not enough fields)
-        log.debug('+++++ Verify parsing of known INVALID GPRMC (not enough fields)')
-        testNMEA = '$GPRMC,225446,A,4916.45,N,12311.12,W,000.5'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        # Verify reporting of status (PGRMC command)
-        log.debug('+++++ Verify reporting of status (PGRMC command)')
-        testNMEA = '$PGRMC'
-        parseNMEA = NMEA.NMEAString (testNMEA)
-        self.assertTrue (parseNMEA.IsValid())
-
-        log.debug ('test_NMEAParser complete')
-
     @defer.inlineCallbacks
     def test_get_capabilities(self):
         """
@@ -510,70 +356,25 @@ class TestNMEA0183Agent (IonTestCase):
 
         # Check agent state upon creation. No transaction needed for
         # get operation.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        yield self._assert_agent_state(AgentState.UNINITIALIZED)
 
         # Begin an explicit transaciton.
-        reply = yield self.ia_client.start_transaction(0)
-        success = reply['success']
-        tid = reply['transaction_id']
-        self.assert_(InstErrorCode.is_ok(success))
-        self.assertEqual(type(tid),str)
-        self.assertEqual(len(tid),36)
+        tid = yield self._start_transaction(0)
         
         # Initialize the agent to bring up the driver and client.
-        cmd = [AgentCommand.TRANSITION,AgentEvent.INITIALIZE]
-        reply = yield self.ia_client.execute_observatory(cmd,tid) 
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok(success))
-
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.INACTIVE)
+        yield self._assert_transition(tid, AgentEvent.INITIALIZE, AgentState.INACTIVE)
 
         #
         params = [InstrumentCapability.ALL]
         reply = yield self.ia_client.get_capabilities(params,tid)
-        success = reply['success']
-        result = reply['result']
+        (success, result) = (reply['success'], reply['result'])
         self.assert_(InstErrorCode.is_ok(success))
         
-        self.assertEqual (list (result[InstrumentCapability.DEVICE_CHANNELS][1]).sort(), NMEADeviceChannel.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.DEVICE_COMMANDS][1]).sort(), NMEADeviceCommand.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.DEVICE_METADATA][1]).sort(), NMEADeviceMetadataParameter.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.DEVICE_PARAMS][1]).sort(),   NMEADeviceParam.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.DEVICE_STATUSES][1]).sort(), NMEADeviceStatus.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.OBSERVATORY_COMMANDS][1]).sort(), AgentCommand.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.OBSERVATORY_METADATA][1]).sort(), MetadataParameter.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.OBSERVATORY_PARAMS][1]).sort(), AgentParameter.list().sort())
-        self.assertEqual (list (result[InstrumentCapability.OBSERVATORY_STATUSES][1]).sort(), AgentStatus.list().sort())
+        for (cap, vals) in capability_values.iteritems():
+            self.assertEqual (frozenset (result[cap][1]), vals)
 
         # Reset the agent to disconnect and bring down the driver and client.
-        cmd = [AgentCommand.TRANSITION,AgentEvent.RESET]
-        reply = yield self.ia_client.execute_observatory(cmd,tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok(success))
-
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)        
+        yield self._assert_transition(tid, AgentEvent.RESET, AgentState.UNINITIALIZED)
 
         # End the transaction.
         reply = yield self.ia_client.end_transaction(tid)
@@ -585,10 +386,14 @@ class TestNMEA0183Agent (IonTestCase):
         """
         Test cases for executing device commands through the instrument agent.
         """
+        from ion.core.process.process import Process
+        from ion.services.dm.distribution.events import DataBlockEventSubscriber
+
         # Setup a subscriber to an event topic
         class TestDataSubscriber(DataBlockEventSubscriber):
             def __init__(self, *args, **kwargs):
                 self.msgs = []
+                self._expected = None
                 DataBlockEventSubscriber.__init__(self, *args, **kwargs)
                 log.info("TestData subscriber is subscribed to channel: %s", kwargs['origin'])
                 
@@ -596,6 +401,27 @@ class TestNMEA0183Agent (IonTestCase):
                 log.debug("TestEventSubscriber received a message with name: %s, content: %s",
                           data['content'].name, data['content']),
                 self.msgs.append(data)
+                if self._expected and len(self.msgs) >= self._expected[0]:
+                    self._fire_expected()
+
+            def expect(self, count, timeout=5.0):
+                """
+                Return a deferred firing with the number of messages received
+                once count have arrived, or after timeout seconds.
+                """
+                d = defer.Deferred()
+                self._expected = (count, d, reactor.callLater(timeout,
+                                                self._fire_expected))
+                if len(self.msgs) >= count:
+                    self._fire_expected()
+                return d
+
+            def _fire_expected(self):
+                (count, d, timer) = self._expected
+                self._expected = None
+                if timer.active():
+                    timer.cancel()
+                d.callback(len(self.msgs))
                 
         subproc = Process()
         yield subproc.spawn()
@@ -606,82 +432,31 @@ class TestNMEA0183Agent (IonTestCase):
         yield testsub.activate()
         
         # Check agent state upon creation. No transaction needed for get operation.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        yield self._assert_agent_state(AgentState.UNINITIALIZED)
 
         # Check that the driver and client descriptions were set by spawnargs, and save them for later restore.
 
         # Begin an explicit transaciton.
-        reply = yield self.ia_client.start_transaction()
-        success = reply['success']
-        tid = reply['transaction_id']
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assertEqual(type (tid), str)
-        self.assertEqual(len (tid), 36)
+        tid = yield self._start_transaction()
 
         # Initialize the agent to bring up the driver and client.
-        cmd = [AgentCommand.TRANSITION, AgentEvent.INITIALIZE]
-        reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok (success))
-
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params, tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.INACTIVE)
+        yield self._assert_transition(tid, AgentEvent.INITIALIZE, AgentState.INACTIVE)
 
         # Connect to the driver.
-        cmd = [AgentCommand.TRANSITION,AgentEvent.GO_ACTIVE]
-        reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok (success))
-
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params, tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.IDLE)
+        yield self._assert_transition(tid, AgentEvent.GO_ACTIVE, AgentState.IDLE)
         
         # Enter observatory mode.
-        cmd = [AgentCommand.TRANSITION, AgentEvent.RUN]
-        reply = yield self.ia_client.execute_observatory (cmd, tid)
-        success = reply['success']
-        result = reply['result']
-        self.assert_(InstErrorCode.is_ok (success))
-    
-        # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status (params, tid)
-        success = reply['success']
-        result = reply['result']
-        agent_state = result[AgentStatus.AGENT_STATE][1]
-        self.assert_(InstErrorCode.is_ok (success))
-        self.assert_(agent_state == AgentState.OBSERVATORY_MODE)
+        yield self._assert_transition(tid, AgentEvent.RUN, AgentState.OBSERVATORY_MODE)
     
         # start acquisition
         reply = yield self.ia_client.execute_device([NMEADeviceChannel.GPS],
             [NMEADeviceCommand.START_AUTO_SAMPLING], tid)
-        success = reply['success']
-        result = reply['result']
+        (success, result) = (reply['success'], reply['result'])
         self.assert_(InstErrorCode.is_ok (success))
 
         # check for a publish event
-        yield pu.asleep(1.0)
-        self.assertEqual(len(testsub.msgs), 2)
+        count = yield testsub.expect(2)
+        self.assertEqual(count, 2)
         
         # End the transaction.
         reply = yield self.ia_client.end_transaction (tid)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+@file ion/agents/instrumentagents/test/does_not_require_hardware/test_enums.py
+@brief Test cases for the instrument enum classes.
+"""
+
+
+from ion.test.iontest import IonTestCase
+from ion.agents.instrumentagents.instrument_constants import BaseEnum
+from ion.agents.instrumentagents.instrument_constants import ObservatoryCapability
+from ion.agents.instrumentagents.instrument_constants import DriverCapability
+from ion.agents.instrumentagents.instrument_constants import InstrumentCapability
+
+
+class TestInstrumentEnums(IonTestCase):
+    """
+    Test that enum members are collected and merged from base enums when
+    the enum classes are defined.
+    """
+
+    def test_merged_members(self):
+        """
+        Test that a derived enum has the members of both its bases and its
+        own, in sorted attribute name order.
+        """
+
+        vals = InstrumentCapability.list()
+        expected = ObservatoryCapability.list() + DriverCapability.list() + \
+            [InstrumentCapability.ALL]
+        self.assertEqual(sorted(vals),sorted(expected))
+
+        names = [attr for attr in dir(InstrumentCapability) if \
+                 not attr.startswith('__') and \
+                 not callable(getattr(InstrumentCapability,attr))]
+        self.assertEqual(vals,[getattr(InstrumentCapability,attr) for attr in \
+                               names])
+
+        for val in expected:
+            self.assert_(InstrumentCapability.has(val))
+            self.assert_(val in InstrumentCapability)
+        self.assert_(not InstrumentCapability.has('CAP_UNKNOWN'))
+        self.assert_(not ObservatoryCapability.has(InstrumentCapability.ALL))
+
+    def test_shadowed_members(self):
+        """
+        Test that members defined on a derived enum shadow inherited ones,
+        and that earlier bases shadow later ones.
+        """
+
+        class First(BaseEnum):
+            A = 'FIRST_A'
+            B = 'FIRST_B'
+
+        class Second(BaseEnum):
+            A = 'SECOND_A'
+            C = 'SECOND_C'
+
+        class Both(First,Second):
+            B = 'BOTH_B'
+
+        self.assertEqual(Both.list(),['FIRST_A','BOTH_B','SECOND_C'])
+        self.assert_(not Both.has('FIRST_B'))
+        self.assert_(not Both.has('SECOND_A'))
@@ -78,7 +78,43 @@ class TestInstrumentErrors(IonTestCase):
             self.assert_(InstErrorCode.is_ok(item) or \
                          InstErrorCode.is_error(item))
 
+    def test_unknown_errors(self):
+        """
+        Test that values only partly matching an error code are rejected.
+        """
+
+        bad_vals = [
+            'ERROR_EXE_DEVICE',
+            ['ERROR_EXE_DEVICE','Some other description.'],
+            ['NOT_AN_ERROR','Could not execute device command.'],
+            []
+        ]
 
+        for item in bad_vals:
+            self.assert_(not InstErrorCode.is_ok(item))
+            self.assert_(not InstErrorCode.is_error(item))
+            self.assert_(not InstErrorCode.is_equal(item,item))
+            self.assertEqual(InstErrorCode.get_string(item),None)
 
+        self.assertEqual(InstErrorCode.get_string(InstErrorCode.EXE_DEVICE_ERR),
+            'ERROR_EXE_DEVICE, Could not execute device command.')
 
 
+    def test_subclass_errors(self):
+        """
+        Test that error codes added by a subclass are recognized by the
+        subclass only.
+        """
+
+        class DeviceErrorCode(InstErrorCode):
+            BAD_READING = ['ERROR_BAD_READING','Device reading out of range.']
+
+        bad_reading = DeviceErrorCode.BAD_READING
+        self.assert_(DeviceErrorCode.has(bad_reading))
+        self.assert_(DeviceErrorCode.is_error(bad_reading))
+        self.assert_(DeviceErrorCode.is_error(tuple(bad_reading)))
+        self.assert_(DeviceErrorCode.is_ok('OK'))
+        self.assert_(DeviceErrorCode.is_error(InstErrorCode.EXE_DEVICE_ERR))
+        self.assert_(not InstErrorCode.is_error(bad_reading))
+        self.assertEqual(DeviceErrorCode.get_string(bad_reading),
+            'ERROR_BAD_READING, Device reading out of range.')
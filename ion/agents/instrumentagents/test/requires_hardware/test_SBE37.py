@@ -913,7 +913,7 @@ class TestSBE37(IonTestCase):
         
         self.assert_(InstErrorCode.is_ok(success))
         self.assertIsInstance(result,(list,tuple))
-        self.assert_(len(result)==1)
+        self.assertEqual(len(result), 1)
         result = result[0]
         self.assertIsInstance(result.get('temperature',None),float)
         self.assertIsInstance(result.get('salinity',None),float)
@@ -90,6 +90,13 @@ SKIP_TESTS = [
 ]    
 
 
+"""
+Status query for the agent state, shared by the state checks. The client
+sends a copy, so the list is never changed.
+"""
+agent_state_params = [AgentStatus.AGENT_STATE]
+
+
 #PRINT_PUBLICATIONS = (True, False)[0]
 
 class TestSBE37Agent(IonTestCase):
@@ -244,13 +251,12 @@ class TestSBE37Agent(IonTestCase):
 
         # Check agent state upon creation. No transaction needed for
         # get operation.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params)
+        reply = yield self.ia_client.get_observatory_status(agent_state_params)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        self.assertEqual(agent_state, AgentState.UNINITIALIZED)
 
         # Check that the driver and client descriptions were set by
         # spawnargs, and save them for later restore.
@@ -283,13 +289,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.INACTIVE)
+        self.assertEqual(agent_state, AgentState.INACTIVE)
 
         # Connect to the driver.
         cmd = [AgentCommand.TRANSITION,AgentEvent.GO_ACTIVE]
@@ -299,13 +305,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.IDLE)
+        self.assertEqual(agent_state, AgentState.IDLE)
         
         # Enter observatory mode.
         cmd = [AgentCommand.TRANSITION,AgentEvent.RUN]
@@ -315,13 +321,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))        
     
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.OBSERVATORY_MODE)
+        self.assertEqual(agent_state, AgentState.OBSERVATORY_MODE)
         
         """
         # Discnnect from the driver.
@@ -332,13 +338,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
         
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.INACTIVE)
+        self.assertEqual(agent_state, AgentState.INACTIVE)
         """
         
         # Reset the agent to disconnect and bring down the driver and client.
@@ -349,13 +355,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)        
+        self.assertEqual(agent_state, AgentState.UNINITIALIZED)        
 
         # End the transaction.
         reply = yield self.ia_client.end_transaction(tid)
@@ -377,13 +383,12 @@ class TestSBE37Agent(IonTestCase):
                 
         # Check agent state upon creation. No transaction needed for
         # get operation.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params)
+        reply = yield self.ia_client.get_observatory_status(agent_state_params)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        self.assertEqual(agent_state, AgentState.UNINITIALIZED)
 
         # Begin an explicit transaciton.
         reply = yield self.ia_client.start_transaction(0)
@@ -401,13 +406,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.INACTIVE)
+        self.assertEqual(agent_state, AgentState.INACTIVE)
 
         # Connect to the driver.
         cmd = [AgentCommand.TRANSITION,AgentEvent.GO_ACTIVE]
@@ -417,13 +422,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.IDLE)
+        self.assertEqual(agent_state, AgentState.IDLE)
         
         # Enter observatory mode.
         cmd = [AgentCommand.TRANSITION,AgentEvent.RUN]
@@ -433,13 +438,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))        
     
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.OBSERVATORY_MODE)
+        self.assertEqual(agent_state, AgentState.OBSERVATORY_MODE)
         
         # Get driver parameters.
         params = [(DriverChannel.ALL,DriverParameter.ALL)]
@@ -504,7 +509,7 @@ class TestSBE37Agent(IonTestCase):
         #print result
 
         self.assert_(InstErrorCode.is_ok(success))
-        self.assert_(len(result)==1)
+        self.assertEqual(len(result), 1)
         self.assertIsInstance(result[0].get('temperature',None),float)
         self.assertIsInstance(result[0].get('salinity',None),float)
         self.assertIsInstance(result[0].get('sound_velocity',None),float)
@@ -607,13 +612,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)        
+        self.assertEqual(agent_state, AgentState.UNINITIALIZED)        
 
         # End the transaction.
         reply = yield self.ia_client.end_transaction(tid)
@@ -636,13 +641,12 @@ class TestSBE37Agent(IonTestCase):
 
         # Check agent state upon creation. No transaction needed for
         # get operation.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params)
+        reply = yield self.ia_client.get_observatory_status(agent_state_params)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)
+        self.assertEqual(agent_state, AgentState.UNINITIALIZED)
 
         # Begin an explicit transaciton.
         reply = yield self.ia_client.start_transaction(0)
@@ -660,13 +664,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.INACTIVE)
+        self.assertEqual(agent_state, AgentState.INACTIVE)
 
         #
         params = [InstrumentCapability.ALL]
@@ -703,13 +707,13 @@ class TestSBE37Agent(IonTestCase):
         self.assert_(InstErrorCode.is_ok(success))
 
         # Check agent state.
-        params = [AgentStatus.AGENT_STATE]
-        reply = yield self.ia_client.get_observatory_status(params,tid)
+        reply = yield self.ia_client.get_observatory_status(
+            agent_state_params,tid)
         success = reply['success']
         result = reply['result']
         agent_state = result[AgentStatus.AGENT_STATE][1]
         self.assert_(InstErrorCode.is_ok(success))        
-        self.assert_(agent_state == AgentState.UNINITIALIZED)        
+        self.assertEqual(agent_state, AgentState.UNINITIALIZED)        
 
         # End the transaction.
         reply = yield self.ia_client.end_transaction(tid)
@@ -10,8 +10,8 @@ A container utilizes the messaging abstractions for AMQP.
 
 """
 
+import logging
 import os
-import string
 import sys
 
 from twisted.internet import defer
@@ -46,8 +46,7 @@ class Container(BasicLifecycleObject):
 
     # Static variables
     # Generate unique container id (and process id prefix). Avoid . chars.
-    id = '%s.%d' % (os.uname()[1], os.getpid())
-    id = string.replace(id, ".", "_")
+    id = ('%s.%d' % (os.uname()[1], os.getpid())).replace('.', '_')
 
     args = None  # Startup arguments
     _started = False
@@ -72,6 +71,10 @@ class Container(BasicLifecycleObject):
         # InterceptorSystem
         self.interceptor_system = None
 
+        # Internal process and publisher for container events
+        self._event_proc = None
+        self._startup_pub = None
+
     @defer.inlineCallbacks
     def on_initialize(self, config, *args, **kwargs):
         """
@@ -85,16 +88,29 @@ class Container(BasicLifecycleObject):
         Container.args = self.config.get('args', None)
 
         self.exchange_manager = ExchangeManager(self)
-        yield self.exchange_manager.initialize(config, *args, **kwargs)
-
         self.proc_manager = ProcessManager(self)
-        yield self.proc_manager.initialize(config, *args, **kwargs)
-
         self.app_manager = AppManager(self)
-        yield self.app_manager.initialize(config, *args, **kwargs)
-
         self.interceptor_system = InterceptorSystem()
-        yield self.interceptor_system.initialize(CF_is_config)
+
+        # Bind the container API below straight to the managers, saving a
+        # call frame per message sent or process spawned.
+        self.spawn_process = self.proc_manager.spawn_process
+        self.spawn_processes = self.proc_manager.spawn_processes
+        self.create_supervisor = self.proc_manager.create_supervisor
+        self.activate_process = self.proc_manager.activate_process
+        self.terminate_process = self.proc_manager.terminate_process
+        self.configure_messaging = self.exchange_manager.configure_messaging
+        self.new_consumer = self.exchange_manager.new_consumer
+        self.send = self.exchange_manager.send
+        self.start_app = self.app_manager.start_app
+        self.start_rel = self.app_manager.start_rel
+
+        # The managers do not depend on each other to initialize
+        yield pu.gather([
+            self.exchange_manager.initialize(config, *args, **kwargs),
+            self.proc_manager.initialize(config, *args, **kwargs),
+            self.app_manager.initialize(config, *args, **kwargs),
+            self.interceptor_system.initialize(CF_is_config)])
 
     @defer.inlineCallbacks
     def on_activate(self, *args, **kwargs):
@@ -106,22 +122,17 @@ class Container(BasicLifecycleObject):
         """
         Container._started = True
 
-        yield self.interceptor_system.activate()
-
-        yield self.exchange_manager.activate()
-
-        yield self.proc_manager.activate()
+        yield pu.gather([
+            self.interceptor_system.activate(),
+            self.exchange_manager.activate(),
+            self.proc_manager.activate()])
 
+        # Apps are started on activation and need messaging in place
         yield self.app_manager.activate()
 
-
         ## Lifecycle event publishing disabled for now 
-        # now that we've activated, can publish ContainerLifecycleEvents as we need the exchange_manager in place.
-        # this is the first chance we have to construct this publisher though.
-        #p = Process(spawnargs={'proc-name': 'ContainerLCEPubProcess'})
-        #yield p.spawn()
-
-        #self._lc_pub = ContainerLifecycleEventPublisher(origin=self.id, process=p)
+        #yield self._start_event_proc()
+        #self._lc_pub = ContainerLifecycleEventPublisher(origin=self.id, process=self._event_proc)
         #yield self._lc_pub.initialize()
         #yield self._lc_pub.activate()
 
@@ -142,17 +153,22 @@ class Container(BasicLifecycleObject):
 
         # technically this is not correct as we're still not quite TERMINATED, but for all intents and purposes..
         # we have to publish before we tear down the messaging framework
+        # (the lifecycle publisher itself is terminated with the event process)
         #yield self._lc_pub.create_and_publish_event(state=self._lc_pub.State.TERMINATED)
-        #yield self._lc_pub.terminate()
-        #yield self._lc_pub._process.terminate()
 
         if self._fatal_error_encountered:
             log.info("Container terminating hard due to fatal error!")
             yield defer.succeed(None)
             defer.returnValue(None)
 
+        # The event process only publishes, so it goes down alongside the
+        # apps. The managers stop in turn: processes still need interceptors
+        # and messaging while they shut down.
         log.info("Terminating app_manager.")
-        yield self.app_manager.terminate()
+        steps = [self.app_manager.terminate()]
+        if self._event_proc:
+            steps.append(self._terminate_event_proc())
+        yield pu.gather(steps)
         log.info("app_manager Terminated.")
 
         log.info("Terminating proc_manager.")
@@ -170,6 +186,34 @@ class Container(BasicLifecycleObject):
         log.info("Container closed")
         Container._started = False
 
+    @defer.inlineCallbacks
+    def _terminate_event_proc(self):
+        """
+        Terminates the container event publisher and its process. Publisher
+        termination sends nothing on the wire, so both go down together.
+        """
+        steps = [self._event_proc.terminate()]
+        if self._startup_pub:
+            steps.append(self._startup_pub.terminate())
+        yield pu.gather(steps)
+
+    @defer.inlineCallbacks
+    def _start_event_proc(self):
+        """
+        Starts the process container events are published from, on first
+        use. It is not spawned, so the proc_manager does not hold on to it.
+        """
+        if self._event_proc:
+            return
+
+        # Imported here, as the process module imports this one.
+        from ion.core.process.process import Process
+
+        proc = Process(spawnargs={'proc-name':'ContainerEventPubProcess'})
+        yield proc.initialize()
+        yield proc.activate()
+        self._event_proc = proc
+
     def on_error(self, *args, **kwargs):
         """An error here is always fatal.
         """
@@ -177,6 +221,7 @@ class Container(BasicLifecycleObject):
         self.fatalError()
 
     # --- Container API -----------
+    # Replaced by the bound manager methods on initialize
 
     # Process management, handled by ProcessManager
     def spawn_process(self, *args, **kwargs):
@@ -210,6 +255,30 @@ class Container(BasicLifecycleObject):
     def start_rel(self, *args, **kwargs):
         return self.app_manager.start_rel(*args, **kwargs)
 
+    @defer.inlineCallbacks
+    def publish_startup_event(self, startup_names):
+        """
+        Announces that the container has started, with the apps, releases
+        and scripts it was started with.
+        @param startup_names list of startup script names
+        @retval Deferred
+        """
+        # Most containers, test containers included, never publish this
+        # event, so the publisher and its process are only set up here.
+        if not self._startup_pub:
+            from ion.services.dm.distribution.events import \
+                ContainerStartupEventPublisher
+
+            yield self._start_event_proc()
+            pub = ContainerStartupEventPublisher(process=self._event_proc)
+            yield pub.initialize()
+            yield pub.activate()
+            self._startup_pub = pub
+
+        evmsg = yield self._startup_pub.create_event(origin=self.id)
+        evmsg.additional_data.startup_names.extend(startup_names)
+        yield self._startup_pub.publish_event(evmsg, origin=self.id)
+
     # Container Events
 
     def fatalError(self, ex=None):
@@ -224,14 +293,22 @@ class Container(BasicLifecycleObject):
         """
         log.error('fatalError event')
         log.error(str(ex))
-        try:
+        # Only format a traceback if there is one, and only once
+        if isinstance(ex, failure.Failure):
+            f = ex
+        elif sys.exc_info()[0] is not None:
             f = failure.Failure()
+        else:
+            f = None
+
+        if f is None:
+            log.info("No Exception to be logged for fatalError")
+        else:
             log.info("The container suffered a fatal error event and is crashing.")
-            log.debug(str(f.getTraceback()))
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f.getTraceback())
             f.printDetailedTraceback()
             log.info("The last traceback, in full detail, was written to stdout and the debug loglevel.")
-        except failure.NoCurrentExceptionError:
-            log.info("No Exception to be logged for fatalError")
 
         if not self._fatal_error_encountered:
             ioninit.shutdown_or_die(30) # let's see what tenacious containers think of this little number
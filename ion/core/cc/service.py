@@ -8,11 +8,30 @@
 
 import os
 import sys
+import errno
 import fcntl
 import re
 
+def _install_reactor():
+    """
+    Install the epoll reactor ahead of any reactor import, unless twistd has
+    already installed one (e.g. via --reactor). The default reactor polls
+    every descriptor on each iteration, which adds up across the many small
+    AMQP frames exchanged by agents and their drivers.
+    """
+    if 'twisted.internet.reactor' in sys.modules:
+        return
+    try:
+        from twisted.internet import epollreactor
+        epollreactor.install()
+    except ImportError:
+        # Not on Linux or the epoll extension is not built; keep the default
+        pass
+
+_install_reactor()
+
 from twisted.application import service
-from twisted.internet import defer
+from twisted.internet import defer, threads
 from twisted.persisted import sob
 from twisted.python import usage
 
@@ -22,10 +41,15 @@ log = ion.util.ionlog.getLogger(__name__)
 from ion.core import ioninit
 from ion.core.cc import container
 from ion.util.path import adjust_dir
-from ion.services.dm.distribution.events import ContainerStartupEventPublisher
-from ion.core.process.process import Process
+from ion.util import procutils as pu
 from ion.core.cc import shell
 
+# Matches a sysname setting in the container startup args
+_SYSNAME_RE = re.compile(r"sysname=\w+")
+
+# Seconds between attempts to take a startup lockfile held by another process
+_LOCK_RETRY_INTERVAL = 0.1
+
 class Options(usage.Options):
     """
     Extra arg for file of "program"/"module" to run.
@@ -53,6 +77,7 @@ class Options(usage.Options):
                 ["no_shell", "n", "Do not start shell"],
                 ["no_history", "i", "Do not read/write history file"],
                 ["no_dbmanhole", None, "Do not start dbmanhole"],
+                ["parallel_start", None, "Start .app and .rel scripts concurrently"],
                     ]
 
     def __init__(self):
@@ -77,11 +102,11 @@ class Options(usage.Options):
         implemented by whoever added it.
         """
         if self['sysname']:
-            if self['args'].count('sysname'):
+            if 'sysname' in self['args']:
                 """I guess it's a good idea to override a redundantly
                 supplied sysname in args"""
                 args = self['args']
-                new_args = re.sub("sysname=\w+", "sysname=%s" % (self['sysname'],), args)
+                new_args = _SYSNAME_RE.sub("sysname=%s" % (self['sysname'],), args)
                 self['args'] = new_args
             else:
                 self['args'] = 'sysname=%s, %s' % (self['sysname'], self['args'],)
@@ -111,10 +136,25 @@ class CapabilityContainer(service.Service):
         self.defer_started = defer.Deferred()
 
         self.lockfile = None
+        self._lock_pending = False
         lockfilepath = self.config.get('lockfile', None)
         if not lockfilepath is None:
             self.lockfile = open(lockfilepath, 'w')
-            fcntl.lockf(self.lockfile, fcntl.LOCK_EX)
+            # Held elsewhere; startService retries until it is released
+            self._lock_pending = not self._try_lock()
+
+    def _try_lock(self):
+        """
+        Takes the lockfile without blocking.
+        @retval True if the lock was taken, False if another process holds it
+        """
+        try:
+            fcntl.lockf(self.lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError, ex:
+            if ex.errno in (errno.EACCES, errno.EAGAIN):
+                return False
+            raise
+        return True
 
     @defer.inlineCallbacks
     def startService(self):
@@ -128,6 +168,12 @@ class CapabilityContainer(service.Service):
         """
         service.Service.startService(self)
 
+        # Poll for a held lockfile from the reactor rather than blocking a
+        # pool thread that reactor shutdown would then wait on
+        while self._lock_pending:
+            yield pu.asleep(_LOCK_RETRY_INTERVAL)
+            self._lock_pending = not self._try_lock()
+
         log.info("ION Capability Container Boot...")
         yield self.start_container()
         log.info("Container started.")
@@ -158,21 +204,7 @@ class CapabilityContainer(service.Service):
         self.defer_started.callback(True)
 
         # event notify that the startup is good to go!
-        p = Process(spawnargs={'proc-name':'ContainerStartupPubProcess'})
-        # don't spawn - we don't want to register with the proc_manager, as they are never removed?
-        yield p.initialize()
-        yield p.activate()
-
-        pub = ContainerStartupEventPublisher(process=p)
-        yield pub.initialize()
-        yield pub.activate()
-
-        evmsg = yield pub.create_event(origin=self.container.id)
-        evmsg.additional_data.startup_names.extend(self.config['scripts'])
-        yield pub.publish_event(evmsg, origin=self.container.id)
-
-        yield pub.terminate()
-        yield p.terminate()
+        yield self.container.publish_startup_event(self.config['scripts'])
 
     @defer.inlineCallbacks
     def stopService(self):
@@ -208,31 +240,82 @@ class CapabilityContainer(service.Service):
         """
         given the path to a file, open that file and exec the code.
         The file may be an .app, a .rel, or a python code script.
+        With parallel_start, apps and releases start concurrently; python
+        scripts still wait for everything listed before them.
         """
         app_args = ioninit.cont_args
+        parallel = self.config.get('parallel_start', False)
+        starting = []
         # Try two script locations, one for IDEs and another for shell.
-        for script in self.config['scripts']:
-            script = adjust_dir(script)
-            if not os.path.isfile(script):
+        # The filesystem is probed from a thread, off the reactor.
+        scripts = yield threads.deferToThread(_resolve_scripts,
+                                              self.config['scripts'])
+        for (script, exists) in scripts:
+            if not exists:
                 log.error('Bad startup script path: %s' % script)
             else:
                 if script.endswith('.app'):
-                    yield self.container.start_app(app_filename=script,app_args=app_args)
+                    d = defer.maybeDeferred(self.container.start_app,
+                            app_filename=script, app_args=app_args)
                 elif script.endswith('.rel'):
-                    yield self.container.start_rel(rel_filename=script)
+                    d = defer.maybeDeferred(self.container.start_rel,
+                            rel_filename=script)
                 else:
+                    # Python scripts run once everything before them started
+                    yield pu.gather(starting)
+                    starting = []
+                    code = yield threads.deferToThread(_compile_script, script)
                     log.info("Executing script %s ..." % script)
-                    execfile(script, {})
+                    exec code in {}
+                    continue
+
+                if parallel:
+                    starting.append(d)
+                else:
+                    yield d
 
+        yield pu.gather(starting)
+
+    @defer.inlineCallbacks
     def run_boot_script(self):
         """
         """
         variable = 'boot' # have to have it...
         file_name = os.path.abspath(self.config['boot_script'])
-        if os.path.isfile(file_name):
-            boot = sob.loadValueFromFile(file_name, variable)
-            return boot()
-        raise RuntimeError('Bad boot script path')
+        exists = yield threads.deferToThread(os.path.isfile, file_name)
+        if not exists:
+            raise RuntimeError('Bad boot script path')
+        # Loading execs the script's top level, which may touch the reactor,
+        # so only the path check runs in a thread.
+        boot = sob.loadValueFromFile(file_name, variable)
+        result = yield boot()
+        defer.returnValue(result)
+
+
+def _resolve_scripts(scripts):
+    """
+    Locates startup scripts. Blocks on the filesystem, so run it in a thread.
+    @param scripts list of script names as given on the command line
+    @retval list of (path, True if the file exists) tuples
+    """
+    resolved = []
+    for script in scripts:
+        path = adjust_dir(script)
+        resolved.append((path, os.path.isfile(path)))
+    return resolved
+
+def _compile_script(path):
+    """
+    Compiles a python startup script. Reads the file, so run it in a thread.
+    @param path path to the script
+    @retval code object for exec
+    """
+    f = open(path, 'rU')
+    try:
+        source = f.read()
+    finally:
+        f.close()
+    return compile(source + '\n', path, 'exec')
 
 
 def makeService(config):
@@ -126,6 +126,11 @@ class AMQPProtocol(AMQClient):
 
     def connectionMade(self):
         self.closed = False
+        # The transport already coalesces all frames written in one reactor
+        # iteration into a single send, so Nagle only adds latency to the
+        # small request/reply frames of rpc_send.
+        if hasattr(self.transport, 'setTcpNoDelay'):
+            self.transport.setTcpNoDelay(True)
         AMQClient.connectionMade(self)
 
     def processFrame(self, frame):
@@ -79,6 +79,9 @@ class ExchangeManager(BasicLifecycleObject):
         """
         @retval Deferred
         """
+        # Close the pooled publisher channels
+        if self.exchange_space:
+            yield self.exchange_space.close()
 
         # Close the broker connection
         yield self.message_space.terminate()
@@ -196,15 +196,78 @@ class ProcessExchangeSpace(ExchangeSpace):
         self.type = "process"
         self.exchange = Exchange(name)
 
+        # Open publishers keyed by their configuration less the routing key,
+        # kept for reuse instead of opening and closing a channel per send.
+        # Sends with the same config share a channel, so a channel level
+        # error fails the sends in flight on it; the next send reopens.
+        self._publishers = {}
+        self._publishers_pending = {}
+
     @defer.inlineCallbacks
     def send(self, to_name, message_data, publisher_config=None, **kwargs):
         if publisher_config is None: publisher_config = {}
 
         pub_config = {'routing_key' : str(to_name)}
         pub_config.update(publisher_config)
-        publisher = yield Publisher.name(self, pub_config)
-        yield publisher.send(message_data)
-        publisher.close()
+        publisher = yield self._get_publisher(pub_config)
+        # Still declare on each send, an auto_delete exchange may have gone
+        # away since the publisher was opened.
+        yield publisher.declare()
+        yield publisher.send(message_data, routing_key=pub_config['routing_key'])
+
+    def _get_publisher(self, pub_config):
+        """
+        @retval Deferred that fires an open Publisher for the given config,
+        shared by all sends with the same config apart from routing key.
+        """
+        key = tuple(sorted([(k, v) for (k, v) in pub_config.iteritems()
+                            if k != 'routing_key']))
+
+        publisher = self._publishers.get(key, None)
+        if publisher is not None and not publisher.channel.closed:
+            return defer.succeed(publisher)
+
+        d = defer.Deferred()
+        waiting = self._publishers_pending.get(key, None)
+        if waiting is not None:
+            waiting.append(d)
+            return d
+        waiting = self._publishers_pending[key] = [d]
+
+        def opened(publisher):
+            del self._publishers_pending[key]
+            self._publishers[key] = publisher
+            for w in waiting:
+                w.callback(publisher)
+
+        def failed(reason):
+            del self._publishers_pending[key]
+            self._publishers.pop(key, None)
+            for w in waiting:
+                w.errback(reason)
+
+        od = self._open_publisher(pub_config)
+        od.addCallbacks(opened, failed)
+        return d
+
+    @defer.inlineCallbacks
+    def _open_publisher(self, pub_config):
+        full_config = self.exchange.config_dict.copy()
+        full_config.update(pub_config)
+        chan = self.client.channel()
+        yield chan.channel_open()
+        defer.returnValue(Publisher(chan, **full_config))
+
+    def close(self):
+        """
+        Close the channels of the cached publishers.
+        @retval Deferred
+        """
+        publishers = self._publishers.values()
+        self._publishers.clear()
+        dl = [publisher.close() for publisher in publishers
+              if not publisher.channel.closed]
+        return defer.DeferredList(dl, consumeErrors=True)
 
 
 class TopicExchangeSpace(ExchangeSpace):
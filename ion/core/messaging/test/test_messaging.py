@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+@file ion/core/messaging/test/test_messaging.py
+@brief Tests for publisher reuse in ProcessExchangeSpace, against a stand-in
+    AMQP client so no broker is needed.
+"""
+
+from twisted.trial import unittest
+from twisted.internet import defer
+
+from ion.core.messaging.messaging import ProcessExchangeSpace
+
+
+class FakeChannel(object):
+    """
+    AMQP channel stand-in. Opening fires the deferred handed out by the
+    client, so tests control when and how opens complete.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.closed = False
+        self.published = []
+
+    def channel_open(self):
+        d = defer.Deferred()
+        self.client.opening.append(d)
+        return d
+
+    def exchange_declare(self, **kwargs):
+        return defer.succeed(None)
+
+    def basic_publish(self, content=None, routing_key=None, **kwargs):
+        self.published.append(routing_key)
+        return defer.succeed(None)
+
+    def channel_close(self):
+        self.closed = True
+        return defer.succeed(None)
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.channels = []
+        self.opening = []
+
+    def channel(self):
+        chan = FakeChannel(self)
+        self.channels.append(chan)
+        return chan
+
+    def open_all(self):
+        opening, self.opening = self.opening, []
+        for d in opening:
+            d.callback(None)
+
+
+class FakeMessageSpace(object):
+
+    def __init__(self):
+        self.client = FakeClient()
+
+
+class ProcessExchangeSpaceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.space = ProcessExchangeSpace(message_space=FakeMessageSpace(),
+                                          name='magnet.topic')
+        self.client = self.space.client
+
+    @defer.inlineCallbacks
+    def test_concurrent_first_sends(self):
+        d1 = self.space.send('a', 'data')
+        d2 = self.space.send('b', 'data')
+        self.assertEqual(len(self.client.channels), 1)
+        self.assertEqual(len(self.client.opening), 1)
+
+        self.client.open_all()
+        yield defer.gatherResults([d1, d2])
+        self.assertEqual(self.client.channels[0].published, ['a', 'b'])
+
+        # Later sends reuse the open channel
+        yield self.space.send('c', 'data')
+        self.assertEqual(len(self.client.channels), 1)
+        self.assertEqual(self.client.channels[0].published, ['a', 'b', 'c'])
+
+    @defer.inlineCallbacks
+    def test_open_failure(self):
+        d1 = self.space.send('a', 'data')
+        d2 = self.space.send('b', 'data')
+        self.client.opening.pop().errback(RuntimeError('open failed'))
+        yield self.assertFailure(d1, RuntimeError)
+        yield self.assertFailure(d2, RuntimeError)
+
+        # A failed open is not cached, the next send opens a new channel
+        d3 = self.space.send('c', 'data')
+        self.client.open_all()
+        yield d3
+        self.assertEqual(len(self.client.channels), 2)
+        self.assertEqual(self.client.channels[1].published, ['c'])
+
+    @defer.inlineCallbacks
+    def test_closed_channel_reopen(self):
+        d = self.space.send('a', 'data')
+        self.client.open_all()
+        yield d
+        self.client.channels[0].closed = True
+
+        d = self.space.send('b', 'data')
+        self.client.open_all()
+        yield d
+        self.assertEqual(len(self.client.channels), 2)
+        self.assertEqual(self.client.channels[0].published, ['a'])
+        self.assertEqual(self.client.channels[1].published, ['b'])
+
+    @defer.inlineCallbacks
+    def test_close(self):
+        d1 = self.space.send('a', 'data')
+        d2 = self.space.send('b', 'data', publisher_config={'mandatory':True})
+        self.client.open_all()
+        yield defer.gatherResults([d1, d2])
+        self.assertEqual(len(self.client.channels), 2)
+
+        yield self.space.close()
+        for chan in self.client.channels:
+            self.assert_(chan.closed)
+
+        # Sends after close open a fresh channel
+        d = self.space.send('c', 'data')
+        self.client.open_all()
+        yield d
+        self.assertEqual(len(self.client.channels), 3)
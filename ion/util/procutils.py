@@ -187,6 +187,21 @@ def asleep(secs):
     delayedCall = reactor.callLater(secs, d.callback, None)
     return d
 
+@defer.inlineCallbacks
+def gather(deferreds):
+    """
+    @brief Wait for independent operations that run concurrently. Fails with
+        the first failure, as if the operations had been run in turn.
+    @param deferreds List of Deferreds
+    @retval Deferred -> list of results, in the order given
+    """
+    try:
+        results = yield defer.DeferredList(deferreds, fireOnOneErrback=True,
+                                           consumeErrors=True)
+    except defer.FirstError, e:
+        e.subFailure.raiseException()
+    defer.returnValue([result for (success, result) in results])
+
 def currenttime():
     """
     @retval current UTC time as float with seconds in epoch and fraction